@@ -17,9 +17,40 @@ class Settings(BaseSettings):
         else os.getenv("BASE_URL", f"http://localhost:{8000}")
     )
     SHORT_CODE_LENGTH: int = 6
+    SHORT_CODE_BLOCK: int = 1000  # sequence numbers each worker reserves at a time
     
     # Storage settings
+    STORAGE_BACKEND: str = "json"  # "json" or "sqlite"
     STORAGE_FILE: str = "/tmp/urls.json" if os.getenv("VERCEL") else "urls.json"
+    SQLITE_FILE: str = "/tmp/urls.db" if os.getenv("VERCEL") else "urls.db"
+    SHARED_STORE: bool = False  # enable when running several worker processes
+    SHARED_SYNC_INTERVAL: float = 1.0  # seconds between picking up other workers' writes
+    SHARED_MISS_SYNC_INTERVAL: float = 0.1  # minimum seconds between syncs triggered by unknown short codes
+    COMPACTION_INTERVAL: int = 60  # seconds between compaction checks
+    COMPACTION_MIN_ENTRIES: int = 1000  # log entries before a snapshot is taken
+    CLICK_FLUSH_SIZE: int = 100  # buffered clicks before a flush
+    CLICK_FLUSH_INTERVAL: float = 5.0  # seconds between click flushes
+    STATS_DEBUG: bool = False  # check running stats against a full recount on every read
+    EXPIRY_SWEEP_INTERVAL: int = 60  # seconds between expired link sweeps
+    EXPIRY_RETENTION: int = 86400  # seconds an expired link answers "expired" before it is purged
+    EXPIRY_SWEEP_BATCH: int = 500  # links purged per batch
+    
+    # Performance settings
+    REDIRECT_CACHE_SIZE: int = 10000  # hot links kept resolved in memory, 0 disables
+    BLOOM_FP_RATE: float = 0.01  # false-positive rate of the unknown-code filter, 0 disables
+    FAST_REDIRECTS: bool = False  # answer cached redirects in raw ASGI middleware
+    QR_CACHE_BYTES: int = 16 * 1024 * 1024  # rendered QR images kept in memory, 0 disables
+    QR_CACHE_DIR: str = "/tmp/qr_cache" if os.getenv("VERCEL") else "qr_cache"  # on-disk QR images, "" disables
+    QR_INLINE: bool = True  # API responses embed QR codes as data URIs instead of /api/qr URLs
+    QR_RENDER_WORKERS: int = 0 if os.getenv("VERCEL") else min(4, os.cpu_count() or 1)  # processes rendering QR codes, 0 renders in-process
+    QR_RENDER_TIMEOUT: float = 5.0  # seconds to wait for a render process before rendering in-process
+    BULK_COMMIT_SIZE: int = 1000  # URLs stored per write (and streamed per chunk) by bulk shorten
+    IMPORT_BATCH_SIZE: int = 5000  # rows validated and stored per batch by link imports
+    IMPORT_WORKERS: int = min(4, (os.cpu_count() or 1) - 1)  # processes validating import batches, 0 validates in-process
+    DEDUP_URLS: bool = False  # reuse the existing link when a URL is shortened again without alias, password or expiry
+    REDIRECT_QUEUE_SIZE: int = 10000  # click events waiting to be applied, 0 counts clicks inline
+    REDIRECT_QUEUE_POLICY: str = "drop"  # when the queue is full: "drop" the event or "block" the redirect
+    REDIRECT_QUEUE_BATCH: int = 500  # events applied per consumer batch
     
     # Security settings
     ALLOWED_HOSTS: list = ["*"]
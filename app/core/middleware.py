@@ -0,0 +1,46 @@
+"""
+ASGI middleware for the redirect hot path
+"""
+from typing import Callable, Iterable, Union
+
+
+class FastRedirectMiddleware:
+    """Answer cached short-code redirects with a raw 302 before FastAPI
+    routing, dependency resolution and validation run.
+
+    Only ``GET /<code>`` requests whose code is in the redirect cache are
+    handled here; the click is recorded after the response is sent.
+    Everything else - paths under ``reserved`` first segments such as
+    ``api``, ``static`` or ``dashboard``, nested paths, cache misses and
+    password-protected links (which are never cached) - passes through to
+    the app unchanged.
+
+    ``url_service`` may also be a function returning the service, called on
+    the first request, so that importing the app does not open the store.
+    """
+
+    def __init__(self, app, url_service: Union[Callable, object], reserved: Iterable[str] = ()):
+        self.app = app
+        self.url_service = None if callable(url_service) else url_service
+        self._get_url_service = url_service if callable(url_service) else None
+        self.reserved = frozenset(reserved)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET":
+            short_code = scope["path"][1:]
+            if short_code and "/" not in short_code and short_code not in self.reserved:
+                if self.url_service is None:
+                    self.url_service = self._get_url_service()
+                redirect = self.url_service.cached_redirect(short_code, count_click=False)
+                if redirect is not None:
+                    await send({
+                        "type": "http.response.start",
+                        "status": 302,
+                        "headers": redirect.raw_headers
+                    })
+                    await send({"type": "http.response.body", "body": b""})
+                    await self.url_service.record_click_async(short_code)
+                    return
+                # Tell the route the cache was already consulted
+                scope.setdefault("state", {})["redirect_cache_checked"] = True
+        await self.app(scope, receive, send)
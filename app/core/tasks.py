@@ -0,0 +1,100 @@
+"""
+Background maintenance tasks run alongside the web application
+"""
+import asyncio
+from typing import List
+
+from app.core.config import settings
+
+_tasks: List[asyncio.Task] = []
+
+
+async def compaction_loop(url_service) -> None:
+    """Periodically fold the mutation log into a fresh snapshot"""
+    while True:
+        await asyncio.sleep(settings.COMPACTION_INTERVAL)
+        if url_service.urls.log_entries < settings.COMPACTION_MIN_ENTRIES:
+            continue
+        try:
+            # Snapshot encoding and file I/O happen off the event loop
+            await asyncio.to_thread(url_service.save_urls)
+        except Exception as e:
+            print(f"Error compacting URL log: {e}")
+
+
+async def click_flush_loop(url_service) -> None:
+    """Flush buffered clicks once the time threshold passes, even when idle"""
+    while True:
+        await asyncio.sleep(settings.CLICK_FLUSH_INTERVAL)
+        if not url_service.clicks.due():
+            continue
+        try:
+            await url_service.flush_clicks_async()
+        except Exception as e:
+            print(f"Error flushing clicks: {e}")
+
+
+async def expiry_sweep_loop(url_service) -> None:
+    """Purge links whose expiry passed more than EXPIRY_RETENTION ago"""
+    while True:
+        await asyncio.sleep(settings.EXPIRY_SWEEP_INTERVAL)
+        try:
+            purged = await url_service.purge_expired_async()
+            total = purged
+            # Keep going while batches come back full
+            while purged >= settings.EXPIRY_SWEEP_BATCH:
+                purged = await url_service.purge_expired_async()
+                total += purged
+            if total:
+                print(f"Purged {total} expired URLs")
+        except Exception as e:
+            print(f"Error purging expired URLs: {e}")
+
+
+async def bloom_rebuild_loop(url_service) -> None:
+    """Rebuild the unknown-code Bloom filter once it is full or stale"""
+    while True:
+        await asyncio.sleep(settings.COMPACTION_INTERVAL)
+        if url_service.known_codes is None or not url_service.known_codes.needs_rebuild:
+            continue
+        try:
+            await url_service.rebuild_filter_async()
+        except Exception as e:
+            print(f"Error rebuilding Bloom filter: {e}")
+
+
+async def sync_loop(url_service) -> None:
+    """Pick up writes from other worker processes sharing the store"""
+    while True:
+        await asyncio.sleep(settings.SHARED_SYNC_INTERVAL)
+        try:
+            await url_service.sync_async()
+        except Exception as e:
+            print(f"Error syncing shared store: {e}")
+
+
+async def redirect_event_loop(url_service) -> None:
+    """Apply queued post-redirect events in batches"""
+    await url_service.redirect_events.run(url_service.apply_redirect_events)
+
+
+def start_background_tasks(url_service) -> None:
+    """Start maintenance tasks on the running event loop"""
+    if _tasks:
+        return
+    _tasks.append(asyncio.create_task(compaction_loop(url_service)))
+    _tasks.append(asyncio.create_task(click_flush_loop(url_service)))
+    _tasks.append(asyncio.create_task(expiry_sweep_loop(url_service)))
+    _tasks.append(asyncio.create_task(bloom_rebuild_loop(url_service)))
+    if url_service.redirect_events is not None:
+        _tasks.append(asyncio.create_task(redirect_event_loop(url_service)))
+    if url_service.shared:
+        _tasks.append(asyncio.create_task(sync_loop(url_service)))
+
+
+async def stop_background_tasks() -> None:
+    """Cancel maintenance tasks and wait for them to finish"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
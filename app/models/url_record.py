@@ -0,0 +1,142 @@
+"""
+Compact in-memory representation of a stored URL
+"""
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Known file types; records store an index into this tuple instead of a str
+FILE_TYPES = [
+    "link", "image", "document", "video", "audio", "archive", "software",
+    "webpage", "code"
+]
+_FILE_TYPE_IDS = {name: index for index, name in enumerate(FILE_TYPES)}
+
+# expires_at of links that never expire, so expiry is one integer comparison
+NEVER = sys.maxsize
+
+
+def to_epoch(value: Any) -> Optional[int]:
+    """Convert an ISO timestamp, datetime or epoch value to epoch seconds"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def to_iso(value: Optional[int]) -> Optional[str]:
+    """Convert epoch seconds to an ISO timestamp"""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value).isoformat()
+
+
+def file_type_id(file_type: Optional[str]) -> int:
+    """Index of a file type in FILE_TYPES, registering unknown ones"""
+    file_type = file_type or "link"
+    index = _FILE_TYPE_IDS.get(file_type)
+    if index is None:
+        index = _FILE_TYPE_IDS[file_type] = len(FILE_TYPES)
+        FILE_TYPES.append(file_type)
+    return index
+
+
+class URLRecord:
+    """One shortened URL.
+
+    Uses ``__slots__``, integer epoch timestamps, a file type index and
+    interned domains so that millions of links take a fraction of the memory
+    of the equivalent dicts. ``from_dict``/``to_dict`` convert to and from the
+    dict shape used by the API, templates and on-disk JSON.
+
+    Records are treated as immutable once stored; use ``replace`` to derive
+    an updated copy.
+    """
+
+    __slots__ = (
+        "short_code", "long_url", "description", "created_at", "clicks",
+        "is_supabase", "file_type_id", "domain", "expires_at",
+        "password_hash", "last_accessed"
+    )
+
+    def __init__(self, short_code: str, long_url: str, created_at: int,
+                 description: Optional[str] = None, clicks: int = 0,
+                 is_supabase: bool = False, file_type: str = "link",
+                 domain: str = "unknown", expires_at: int = NEVER,
+                 password_hash: Optional[str] = None,
+                 last_accessed: Optional[int] = None):
+        self.short_code = short_code
+        self.long_url = long_url
+        self.description = description
+        self.created_at = created_at
+        self.clicks = clicks
+        self.is_supabase = is_supabase
+        self.file_type_id = file_type_id(file_type)
+        self.domain = sys.intern(domain) if domain else "unknown"
+        self.expires_at = expires_at
+        self.password_hash = password_hash
+        self.last_accessed = last_accessed
+
+    @property
+    def file_type(self) -> str:
+        return FILE_TYPES[self.file_type_id]
+
+    @property
+    def expiry_date(self) -> Optional[str]:
+        return None if self.expires_at == NEVER else to_iso(self.expires_at)
+
+    @property
+    def has_password(self) -> bool:
+        return self.password_hash is not None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], short_code: Optional[str] = None) -> "URLRecord":
+        """Build a record from the API/JSON dict shape"""
+        expires_at = to_epoch(data.get("expiry_date"))
+        return cls(
+            short_code=short_code or data["short_code"],
+            long_url=data["long_url"],
+            created_at=to_epoch(data.get("created_at")) or 0,
+            description=data.get("description"),
+            clicks=data.get("clicks") or 0,
+            is_supabase=bool(data.get("is_supabase")),
+            file_type=data.get("file_type"),
+            domain=data.get("domain"),
+            expires_at=NEVER if expires_at is None else expires_at,
+            password_hash=data.get("password_hash") or None,
+            last_accessed=to_epoch(data.get("last_accessed"))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the API/JSON dict shape"""
+        return {
+            "long_url": self.long_url,
+            "short_code": self.short_code,
+            "created_at": to_iso(self.created_at),
+            "description": self.description,
+            "clicks": self.clicks,
+            "is_supabase": self.is_supabase,
+            "file_type": self.file_type,
+            "domain": self.domain,
+            "expiry_date": self.expiry_date,
+            "password_hash": self.password_hash,
+            "last_accessed": to_iso(self.last_accessed)
+        }
+
+    def replace(self, **changes: Any) -> "URLRecord":
+        """Copy of this record with some slots changed"""
+        record = URLRecord.__new__(URLRecord)
+        for name in self.__slots__:
+            setattr(record, name, changes.get(name, getattr(self, name)))
+        return record
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, URLRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"URLRecord({self.short_code!r}, {self.long_url!r})"
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, Form, Query
-from fastapi.responses import JSONResponse
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, File, Form, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import Optional, List
 from datetime import datetime
 
 from app.models.url_models import URLCreate, URLResponse, URLInfo, URLStats
 from ..services.url_service import URLService
+from app.core.config import settings
 from app.core.dependencies import get_url_service
+from app.services.link_import import FORMATS, LinkImporter, decode_lines, detect_format
+from app.services.qr_export import qr_zip
+from app.services.qr_render import FORMATS as QR_FORMATS, qr_key
 
 router = APIRouter()
-url_service = get_url_service()
 
 @router.post("/shorten", response_model=URLResponse)
 async def shorten_url(
@@ -16,10 +22,11 @@ async def shorten_url(
     custom_alias: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     expiry_date: Optional[datetime] = Form(None),
-    password: Optional[str] = Form(None)
+    password: Optional[str] = Form(None),
+    url_service: URLService = Depends(get_url_service)
 ):
     """API endpoint to shorten a URL"""
-    result = url_service.shorten_url(
+    result = await url_service.shorten_url_async(
         long_url=long_url,
         custom_alias=custom_alias,
         description=description,
@@ -33,7 +40,7 @@ async def shorten_url(
     return URLResponse(**result)
 
 @router.get("/info/{short_code}", response_model=URLInfo)
-async def get_url_info(short_code: str):
+async def get_url_info(short_code: str, url_service: URLService = Depends(get_url_service)):
     """Get information about a shortened URL"""
     result = url_service.get_url_info(short_code)
     
@@ -43,7 +50,11 @@ async def get_url_info(short_code: str):
     return URLInfo(**result)
 
 @router.get("/expand/{short_code}")
-async def expand_url(short_code: str, password: Optional[str] = Query(None)):
+async def expand_url(
+    short_code: str,
+    password: Optional[str] = Query(None),
+    url_service: URLService = Depends(get_url_service)
+):
     """Expand a shortened URL"""
     result = url_service.expand_url(short_code, password)
     
@@ -53,9 +64,9 @@ async def expand_url(short_code: str, password: Optional[str] = Query(None)):
     return result
 
 @router.delete("/delete/{short_code}")
-async def delete_url(short_code: str):
+async def delete_url(short_code: str, url_service: URLService = Depends(get_url_service)):
     """Delete a shortened URL"""
-    result = url_service.delete_url(short_code)
+    result = await url_service.delete_url_async(short_code)
     
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
@@ -65,18 +76,30 @@ async def delete_url(short_code: str):
 @router.get("/list")
 async def list_urls(
     limit: Optional[int] = Query(None, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    url_service: URLService = Depends(get_url_service)
 ):
     """List all shortened URLs with pagination"""
-    return url_service.list_urls(limit=limit, offset=offset)
+    result = url_service.list_urls(limit=limit, offset=offset, cursor=cursor)
+    
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    
+    return result
 
 @router.get("/stats", response_model=URLStats)
-async def get_stats():
+async def get_stats(url_service: URLService = Depends(get_url_service)):
     """Get usage statistics"""
     return URLStats(**url_service.get_stats())
 
+@router.get("/metrics")
+async def get_metrics(url_service: URLService = Depends(get_url_service)):
+    """Get cache metrics for monitoring"""
+    return url_service.metrics()
+
 @router.get("/html/{short_code}")
-async def get_html_code(short_code: str):
+async def get_html_code(short_code: str, url_service: URLService = Depends(get_url_service)):
     """Generate HTML code snippet for a shortened URL"""
     result = url_service.generate_html_code(short_code)
     
@@ -85,13 +108,108 @@ async def get_html_code(short_code: str):
     
     return result
 
+@router.get("/qr/{short_code}")
+async def get_qr_code(
+    request: Request,
+    short_code: str,
+    format: str = Query("png"),
+    url_service: URLService = Depends(get_url_service)
+):
+    """QR code image for a short URL (PNG or SVG), cacheable for a year:
+    the image for a short URL never changes"""
+    if format not in QR_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be png or svg")
+    if not settings.ENABLE_QR_CODES:
+        raise HTTPException(status_code=404, detail="QR codes are disabled")
+    if "error" in url_service.get_url_info(short_code):
+        raise HTTPException(status_code=404, detail="URL not found")
+    
+    short_url = f"{url_service.base_url}/{short_code}"
+    etag = f'"{qr_key(short_url, format)}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    image = await url_service.qr_image_async(short_url, format)
+    return Response(image, media_type=QR_FORMATS[format], headers=headers)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers an ETag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+@router.post("/qr/export")
+async def export_qr_codes(
+    short_codes: List[str],
+    format: str = Query("png"),
+    url_service: URLService = Depends(get_url_service)
+):
+    """ZIP of QR codes (PNG or SVG) for a list of short codes, streamed as
+    the codes are rendered; unknown codes are listed in missing.txt"""
+    if format not in QR_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be png or svg")
+    if not settings.ENABLE_QR_CODES:
+        raise HTTPException(status_code=404, detail="QR codes are disabled")
+    if not short_codes:
+        raise HTTPException(status_code=400, detail="Please provide at least one short code")
+    
+    # A plain generator: Starlette runs each step on a worker thread
+    return StreamingResponse(
+        qr_zip(url_service, short_codes, format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="qr-codes-{format}.zip"'}
+    )
+
 @router.post("/bulk-shorten")
-async def bulk_shorten_urls(urls: List[str]):
-    """Bulk shorten multiple URLs"""
-    results = []
+async def bulk_shorten_urls(
+    request: Request,
+    urls: List[str],
+    qr: bool = Query(False),
+    url_service: URLService = Depends(get_url_service)
+):
+    """Bulk shorten multiple URLs; with ``Accept: application/x-ndjson``
+    results stream back one per line as each chunk is stored"""
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        async def lines():
+            async for results in url_service.bulk_shorten_async(urls, with_qr=qr):
+                yield "".join(json.dumps(result) + "\n" for result in results)
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
     
-    for url in urls:
-        result = url_service.shorten_url(url)
-        results.append(result)
+    results = []
+    async for chunk in url_service.bulk_shorten_async(urls, with_qr=qr):
+        results.extend(chunk)
     
     return {"results": results}
+
+@router.post("/import")
+async def import_links(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None),
+    url_service: URLService = Depends(get_url_service)
+):
+    """Import a CSV or NDJSON link dump, streaming back NDJSON events: one
+    per rejected row and a progress line (rows, rows/sec) per batch"""
+    fmt = format or detect_format(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="Pass format=csv or format=ndjson")
+    
+    # Parsing and validation run in a worker thread (and processes); writes
+    # go through the storage I/O thread like every other mutation
+    importer = LinkImporter(
+        url_service,
+        batch_size=settings.IMPORT_BATCH_SIZE,
+        workers=settings.IMPORT_WORKERS,
+        store=lambda rows: url_service.io.submit(url_service.import_links, rows).result()
+    )
+    batches = importer.run(decode_lines(file.file), fmt)
+    
+    async def lines():
+        while True:
+            events = await asyncio.to_thread(next, batches, None)
+            if events is None:
+                break
+            yield "".join(json.dumps(event) + "\n" for event in events)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Request, Form, HTTPException, Query
+from fastapi import APIRouter, Depends, Request, Form, HTTPException, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional
@@ -9,19 +9,29 @@ from ..services.url_service import URLService
 from app.core.dependencies import get_url_service
 
 router = APIRouter()
-url_service = get_url_service()
 
 # Initialize templates
 BASE_DIR = Path(__file__).resolve().parent.parent
 templates = Jinja2Templates(directory=BASE_DIR / "templates")
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, page: int = Query(1, ge=1)):
+async def dashboard(
+    request: Request,
+    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
+    url_service: URLService = Depends(get_url_service)
+):
     """Dashboard page with URL management"""
     limit = 20
     offset = (page - 1) * limit
     
-    urls_data = url_service.list_urls(limit=limit, offset=offset)
+    # "Next" links carry a cursor so deep pages do not skip over offset rows
+    if cursor:
+        urls_data = url_service.list_urls(limit=limit, cursor=cursor)
+        if "error" in urls_data:
+            raise HTTPException(status_code=400, detail=urls_data["error"])
+    else:
+        urls_data = url_service.list_urls(limit=limit, offset=offset)
     stats = url_service.get_stats()
     
     total_pages = (urls_data["total"] + limit - 1) // limit
@@ -35,12 +45,13 @@ async def dashboard(request: Request, page: int = Query(1, ge=1)):
             "page": page,
             "total_pages": total_pages,
             "has_prev": page > 1,
-            "has_next": page < total_pages
+            "has_next": urls_data["next_cursor"] is not None,
+            "next_cursor": urls_data["next_cursor"]
         }
     )
 
 @router.get("/analytics", response_class=HTMLResponse)
-async def analytics(request: Request):
+async def analytics(request: Request, url_service: URLService = Depends(get_url_service)):
     """Analytics page"""
     stats = url_service.get_stats()
     recent_urls = url_service.get_recent_urls(limit=20)
@@ -68,7 +79,8 @@ async def shorten_url_form(
     long_url: str = Form(...),
     custom_alias: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
-    password: Optional[str] = Form(None)
+    password: Optional[str] = Form(None),
+    url_service: URLService = Depends(get_url_service)
 ):
     """Handle form submission for URL shortening"""
     
@@ -94,7 +106,7 @@ async def shorten_url_form(
     print(f"  - description: '{description}'")
     print(f"  - password: '{password}'")
     
-    result = url_service.shorten_url(
+    result = await url_service.shorten_url_async(
         long_url=long_url,
         custom_alias=custom_alias,
         description=description,
@@ -102,8 +114,8 @@ async def shorten_url_form(
     )
     
     print(f"🔨 URL Creation Result: {result}")
-    print(f"📁 Current URLs in storage: {list(url_service.urls.keys())}")
-    print(f"💾 Storage file path: {url_service.storage_file}")
+    print(f"📁 URLs in storage: {len(url_service.urls)}")
+    print(f"💾 Storage: {url_service.storage_stats()['backend']}")
     
     if "error" in result:
         # Return to home page with error
@@ -131,7 +143,11 @@ async def shorten_url_form(
     )
 
 @router.get("/result/{short_code}", response_class=HTMLResponse)
-async def show_result(request: Request, short_code: str):
+async def show_result(
+    request: Request,
+    short_code: str,
+    url_service: URLService = Depends(get_url_service)
+):
     """Show result page after URL shortening"""
     url_info = url_service.get_url_info(short_code)
     
@@ -139,7 +155,7 @@ async def show_result(request: Request, short_code: str):
         raise HTTPException(status_code=404, detail="URL not found")
     
     # Generate QR code and HTML snippet
-    qr_code = url_service.generate_qr_code(f"{url_service.base_url}/{short_code}")
+    qr_code = url_service.qr_code_for(short_code, inline=False)
     html_result = url_service.generate_html_code(short_code)
     
     return templates.TemplateResponse(
@@ -154,14 +170,18 @@ async def show_result(request: Request, short_code: str):
     )
 
 @router.get("/info/{short_code}", response_class=HTMLResponse)
-async def url_info_page(request: Request, short_code: str):
+async def url_info_page(
+    request: Request,
+    short_code: str,
+    url_service: URLService = Depends(get_url_service)
+):
     """Detailed information page for a URL"""
     url_info = url_service.get_url_info(short_code)
     
     if "error" in url_info:
         raise HTTPException(status_code=404, detail="URL not found")
     
-    qr_code = url_service.generate_qr_code(f"{url_service.base_url}/{short_code}")
+    qr_code = url_service.qr_code_for(short_code, inline=False)
     html_result = url_service.generate_html_code(short_code)
     
     return templates.TemplateResponse(
@@ -176,9 +196,9 @@ async def url_info_page(request: Request, short_code: str):
     )
 
 @router.post("/delete/{short_code}")
-async def delete_url_form(short_code: str):
+async def delete_url_form(short_code: str, url_service: URLService = Depends(get_url_service)):
     """Delete URL via form submission"""
-    result = url_service.delete_url(short_code)
+    result = await url_service.delete_url_async(short_code)
     
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
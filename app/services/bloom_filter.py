@@ -0,0 +1,126 @@
+"""
+Bloom filter over existing short codes
+"""
+import math
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class _Bits:
+    """Fixed-size Bloom filter bit array"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, key: str) -> None:
+        bits = self.bits
+        for index in self._indexes(key):
+            bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for index in self._indexes(key):
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+    def _indexes(self, key: str):
+        # Double hashing: every index derived from one 64-bit hash
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hashes))
+
+
+class BloomFilter:
+    """Which short codes may exist, so lookups for unknown codes (scanners,
+    typos) are answered without touching storage.
+
+    Bits cannot be cleared, so deleted codes stay in the filter as false
+    positives until the next ``rebuild()``. ``needs_rebuild`` turns true once
+    the filter holds more codes than it was sized for or a quarter of them
+    are stale; rebuilding runs off the request path and keeps accepting
+    ``add()`` calls while the new bit array is filled.
+    """
+
+    def __init__(self, fp_rate: float, codes: Iterable[str] = (), capacity: int = 1024):
+        self.fp_rate = fp_rate
+        self._bits = _Bits(capacity, fp_rate)
+        self._next: Optional[_Bits] = None
+        self._lock = threading.Lock()
+        self.stale = 0
+        self.negatives = 0
+        self.false_positives = 0
+        for code in codes:
+            self._bits.add(code)
+
+    def add(self, short_code: str) -> None:
+        with self._lock:
+            self._bits.add(short_code)
+            if self._next is not None:
+                self._next.add(short_code)
+
+    def discard(self, short_code: str) -> None:
+        """Note a deleted code; its bits stay set until the next rebuild"""
+        self.stale += 1
+
+    def __contains__(self, short_code: str) -> bool:
+        if short_code in self._bits:
+            return True
+        self.negatives += 1
+        return False
+
+    def record_false_positive(self) -> None:
+        """Note a code the filter let through that storage did not have"""
+        self.false_positives += 1
+
+    @property
+    def needs_rebuild(self) -> bool:
+        bits = self._bits
+        return bits.count > bits.capacity or self.stale * 4 > max(bits.count, 1)
+
+    def rebuild(self, list_codes: Callable[[], Iterable[str]], count: int) -> None:
+        """Refill the filter from the current codes, sized for growth.
+
+        ``list_codes`` is only called once the new bit array takes ``add()``
+        calls, so a code stored while the list is taken is not lost.
+        """
+        bits = _Bits(max(1024, count * 2), self.fp_rate)
+        with self._lock:
+            self._next = bits
+            self.stale = 0
+        try:
+            for code in list_codes():
+                bits.add(code)
+        except Exception:
+            # A partly filled array would reject existing codes; keep the old one
+            with self._lock:
+                self._next = None
+            raise
+        with self._lock:
+            if self._next is bits:
+                self._bits, self._next = bits, None
+
+    def stats(self) -> Dict[str, Any]:
+        bits = self._bits
+        # Expected rate for the number of codes added: (1 - e^(-kn/m))^k
+        expected = (1 - math.exp(-bits.hashes * bits.count / bits.size)) ** bits.hashes
+        # Lookups for codes that did not exist, caught or let through
+        unknown = self.negatives + self.false_positives
+        return {
+            "capacity": bits.capacity,
+            "codes": bits.count,
+            "stale": self.stale,
+            "bits": bits.size,
+            "hashes": bits.hashes,
+            "target_fp_rate": self.fp_rate,
+            "expected_fp_rate": round(expected, 6),
+            "negatives": self.negatives,
+            "false_positives": self.false_positives,
+            "observed_fp_rate": round(self.false_positives / unknown, 6) if unknown else None
+        }
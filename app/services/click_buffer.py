@@ -0,0 +1,64 @@
+"""
+Write-behind buffer for click counts
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ClickBuffer:
+    """Click increments and last-access times that are not persisted yet.
+
+    Redirects only touch this in-memory buffer; the owner flushes it to
+    storage in one batch once ``max_pending`` clicks have accumulated or
+    ``flush_interval`` seconds have passed since the last flush. Safe to use
+    from the event loop while a flush runs on the storage I/O thread.
+    """
+
+    def __init__(self, max_pending: int = 100, flush_interval: float = 5.0):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self.pending_clicks = 0
+        self.last_flush = time.monotonic()
+
+    def record(self, short_code: str, accessed_at: int) -> bool:
+        """Buffer one click; return True when a flush is due"""
+        with self._lock:
+            entry = self._pending.get(short_code)
+            if entry is None:
+                self._pending[short_code] = [1, accessed_at]
+            else:
+                entry[0] += 1
+                entry[1] = accessed_at
+            self.pending_clicks += 1
+        return self.due()
+
+    def due(self) -> bool:
+        """Check whether the size or time threshold has been reached"""
+        if not self._pending:
+            return False
+        return (self.pending_clicks >= self.max_pending
+                or time.monotonic() - self.last_flush >= self.flush_interval)
+
+    def get(self, short_code: str) -> Optional[Tuple[int, int]]:
+        """Pending (clicks, last_accessed epoch) for a short code, if any"""
+        with self._lock:
+            entry = self._pending.get(short_code)
+            return (entry[0], entry[1]) if entry else None
+
+    def discard(self, short_code: str) -> None:
+        """Forget pending clicks for a short code that no longer exists"""
+        with self._lock:
+            entry = self._pending.pop(short_code, None)
+            if entry:
+                self.pending_clicks -= entry[0]
+
+    def drain(self) -> Dict[str, Tuple[int, int]]:
+        """Remove and return all pending clicks"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self.pending_clicks = 0
+            self.last_flush = time.monotonic()
+        return {code: (entry[0], entry[1]) for code, entry in pending.items()}
@@ -0,0 +1,129 @@
+"""
+Collision-free short code allocation
+"""
+import json
+import os
+import secrets
+import string
+import threading
+from typing import Callable, Dict, Optional
+
+from app.services.storage import FileLock
+
+BASE62 = string.ascii_letters + string.digits
+
+
+class CodeSequence:
+    """Bijective scramble of 0..62**length - 1 into fixed-length base62 codes.
+
+    A keyed four-round Feistel network permutes the smallest even-width bit
+    domain covering the code space; values that land outside the space are
+    fed through again (cycle walking), so every sequence number maps to a
+    distinct code and consecutive numbers look unrelated.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, length: int, key: int):
+        self.length = length
+        self.space = 62 ** length
+        bits = self.space.bit_length()
+        self._half = (bits + 1) // 2
+        self._mask = (1 << self._half) - 1
+        self._keys = [(key >> (16 * i)) & 0xFFFF | 1 for i in range(self.ROUNDS)]
+
+    def _round(self, value: int, key: int) -> int:
+        value = (value ^ key) * 0x9E3779B1 & 0xFFFFFFFFFFFF
+        return (value ^ (value >> 17)) & self._mask
+
+    def permute(self, n: int) -> int:
+        half, mask = self._half, self._mask
+        while True:
+            left, right = n >> half, n & mask
+            for key in self._keys:
+                left, right = right, left ^ self._round(right, key)
+            n = (left << half) | right
+            if n < self.space:
+                return n
+
+    def encode(self, n: int) -> str:
+        chars = []
+        for _ in range(self.length):
+            n, digit = divmod(n, 62)
+            chars.append(BASE62[digit])
+        return "".join(reversed(chars))
+
+    def code(self, n: int) -> str:
+        return self.encode(self.permute(n))
+
+
+class ShortCodeAllocator:
+    """Hands out short codes without probing storage for collisions.
+
+    Random-looking codes come from a shared sequence scrambled by
+    ``CodeSequence``. Each process reserves ``block_size`` sequence numbers
+    at a time from a counter file (under an exclusive file lock, which also
+    holds the per-deployment scramble key), so workers only coordinate once
+    per block. Numbers left in a block when a process exits are skipped.
+    Without ``fcntl`` (Windows) the file lock is a no-op, so only a single
+    process may allocate from a counter file there.
+
+    Alias suffixes use a next-suffix counter per base alias. A base's
+    counter starts by skipping suffixes already taken, once per process;
+    after that every suffix is found in constant time.
+    """
+
+    def __init__(self, counter_file: str, length: int, block_size: int = 1000):
+        self.counter_file = counter_file
+        self.length = length
+        self.block_size = block_size
+        self._sequence: Optional[CodeSequence] = None
+        self._next = 0
+        self._end = 0
+        self._suffixes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(f"{counter_file}.lock")
+        self.blocks_reserved = 0
+
+    def next_code(self, taken: Callable[[str], bool]) -> str:
+        """Next code from the sequence that ``taken`` does not reject
+        (legacy random codes and custom aliases can occupy a few)"""
+        with self._lock:
+            while True:
+                if self._next >= self._end:
+                    self._reserve_block()
+                code = self._sequence.code(self._next)
+                self._next += 1
+                if not taken(code):
+                    return code
+
+    def next_suffixed(self, base: str, taken: Callable[[str], bool]) -> str:
+        """``base-N`` with the lowest N this process has not handed out"""
+        with self._lock:
+            n = self._suffixes.get(base, 1)
+            while taken(f"{base}-{n}"):
+                n += 1
+            self._suffixes[base] = n + 1
+            return f"{base}-{n}"
+
+    def _reserve_block(self) -> None:
+        with self._file_lock:
+            try:
+                with open(self.counter_file) as f:
+                    state = json.load(f)
+            except FileNotFoundError:
+                state = {"key": secrets.randbits(64), "next": 0}
+            start = state["next"]
+            if self._sequence is None:
+                self._sequence = CodeSequence(self.length, state["key"])
+            if start >= self._sequence.space:
+                raise RuntimeError(f"All {self.length}-character short codes are allocated")
+            state["next"] = min(start + self.block_size, self._sequence.space)
+            temp_file = f"{self.counter_file}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.counter_file)
+        self._next, self._end = start, state["next"]
+        self.blocks_reserved += 1
@@ -0,0 +1,50 @@
+"""
+Creation-time ordered index of short codes
+"""
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+
+from app.models.url_record import URLRecord
+
+
+class CreatedIndex:
+    """Short codes sorted by ``(created_at, short_code)``.
+
+    Kept as two parallel lists so lookups use the C ``bisect`` functions and
+    each entry costs two list slots. New links sort to the end, so inserting
+    them is an append in practice.
+    """
+
+    def __init__(self, records: Iterable[URLRecord] = ()):
+        keys = sorted((record.created_at, record.short_code) for record in records)
+        self._times: List[int] = [created_at for created_at, _ in keys]
+        self._codes: List[str] = [code for _, code in keys]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def add(self, created_at: int, short_code: str) -> None:
+        position = self._position(created_at, short_code)
+        self._times.insert(position, created_at)
+        self._codes.insert(position, short_code)
+
+    def remove(self, created_at: int, short_code: str) -> None:
+        position = self._position(created_at, short_code)
+        if position < len(self._codes) and self._codes[position] == short_code \
+                and self._times[position] == created_at:
+            del self._times[position]
+            del self._codes[position]
+
+    def newest(self, limit: Optional[int] = None, offset: int = 0,
+               before: Optional[Tuple[int, str]] = None) -> List[str]:
+        """Short codes newest first, skipping ``offset`` of them and
+        starting after the ``before`` key when given"""
+        end = len(self._codes) if before is None else self._position(*before)
+        end = max(0, end - offset)
+        start = 0 if limit is None else max(0, end - limit)
+        return self._codes[start:end][::-1]
+
+    def _position(self, created_at: int, short_code: str) -> int:
+        low = bisect_left(self._times, created_at)
+        high = bisect_right(self._times, created_at, low)
+        return bisect_left(self._codes, short_code, low, high)
@@ -0,0 +1,71 @@
+"""
+Index of shareable links by normalised long URL
+"""
+import hashlib
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from app.models.url_record import NEVER, URLRecord
+
+_DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+
+
+def normalize_url(url: str) -> str:
+    """Strip whitespace, lowercase the scheme and host, drop a default port
+    and give an empty path a "/"; the rest of the URL is kept as is"""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    default_port = _DEFAULT_PORTS.get(scheme)
+    if default_port and netloc.endswith(default_port):
+        netloc = netloc[:-len(default_port)]
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+class DedupIndex:
+    """Normalised long URL -> short code of an existing link that can be
+    handed out again: one without a password or expiry.
+
+    Keys are 16-byte BLAKE2b digests of the normalised URL. The index is
+    rebuilt from storage on startup. An entry can outlive its link (after
+    a delete in another worker, say), so callers check the record an entry
+    points to before using it and ``discard`` it when it no longer matches.
+    """
+
+    def __init__(self, records: Iterable[URLRecord] = ()):
+        self._codes: Dict[bytes, str] = {}
+        for record in records:
+            self.add(record)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    @staticmethod
+    def key(long_url: str) -> bytes:
+        return hashlib.blake2b(normalize_url(long_url).encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def shareable(record: URLRecord) -> bool:
+        return record.password_hash is None and record.expires_at == NEVER
+
+    def add(self, record: URLRecord) -> None:
+        if self.shareable(record):
+            # The first link created for a URL stays the canonical one
+            self._codes.setdefault(self.key(record.long_url), record.short_code)
+
+    def get(self, long_url: str) -> Optional[str]:
+        return self._codes.get(self.key(long_url))
+
+    def matches(self, record: URLRecord, long_url: str) -> bool:
+        """Whether ``record`` can be handed out for ``long_url``"""
+        return self.shareable(record) and self.key(record.long_url) == self.key(long_url)
+
+    def discard(self, long_url: str, short_code: str) -> None:
+        """Drop the entry for ``long_url`` if it points at ``short_code``"""
+        key = self.key(long_url)
+        if self._codes.get(key) == short_code:
+            del self._codes[key]
@@ -0,0 +1,182 @@
+"""
+Streaming import of link dumps in CSV or NDJSON
+"""
+import codecs
+import csv
+import json
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.models.url_record import NEVER, to_epoch
+from app.services.url_classifier import (
+    extract_filename, get_domain, get_file_type, is_supabase_url, is_valid_alias, is_valid_url
+)
+
+FORMATS = ("csv", "ndjson")
+
+# (row number, row fields or None, error or None)
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Import format implied by a file name, if any"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def decode_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decode an uploaded dump as UTF-8, dropping the byte order mark Excel
+    puts at the start of a CSV, which would corrupt the first header name"""
+    return codecs.iterdecode(chunks, "utf-8-sig")
+
+
+def read_rows(lines: Iterable[str], fmt: str) -> Iterator[Row]:
+    """Parse rows one at a time. CSV needs a header row; NDJSON has one
+    object per line. Rows are numbered from 1, not counting the header."""
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(lines), 1):
+            yield number, row, None
+    elif fmt == "ndjson":
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(row, dict):
+                yield number, row, None
+            else:
+                yield number, None, "Expected a JSON object"
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+def prepare_rows(rows: List[Row]) -> List[Row]:
+    """Validate and classify a chunk of rows into ``URLRecord`` fields.
+
+    Runs in worker processes, so it touches no storage; short codes are
+    checked for uniqueness when the chunk is stored.
+    """
+    now = int(time.time())
+    prepared = []
+    for number, row, error in rows:
+        if error is None:
+            try:
+                row, error = _prepare_row(row, now), None
+            except ValueError as e:
+                row, error = None, str(e)
+        prepared.append((number, row, error))
+    return prepared
+
+
+def _prepare_row(row: Dict[str, Any], now: int) -> Dict[str, Any]:
+    long_url = str(row.get("long_url") or row.get("url") or "").strip()
+    if not long_url or not is_valid_url(long_url):
+        raise ValueError("Please provide a valid URL")
+    short_code = str(row.get("short_code") or row.get("custom_alias") or "").strip() or None
+    if short_code is not None and not is_valid_alias(short_code):
+        raise ValueError("Short code can only contain letters, numbers, hyphens, and underscores")
+    try:
+        created_at = _timestamp(row.get("created_at")) or now
+        expires_at = _timestamp(row.get("expiry_date")) or NEVER
+        clicks = int(row.get("clicks") or 0)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value: {e}")
+    if clicks < 0:
+        raise ValueError("Clicks cannot be negative")
+    return {
+        "short_code": short_code,
+        "long_url": long_url,
+        "created_at": created_at,
+        "description": row.get("description") or extract_filename(long_url) or "Link",
+        "clicks": clicks,
+        "is_supabase": is_supabase_url(long_url),
+        "file_type": get_file_type(long_url),
+        "domain": get_domain(long_url),
+        "expires_at": expires_at,
+        "password_hash": row.get("password_hash") or None
+    }
+
+
+def _timestamp(value: Any) -> Optional[int]:
+    """Epoch seconds from an ISO timestamp or epoch number (CSV gives strings)"""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return to_epoch(value)
+
+
+class LinkImporter:
+    """Imports a stream of rows in batches of ``batch_size``.
+
+    Rows are validated and classified ``batch_size`` at a time, in
+    ``workers`` processes when workers > 0, with at most two chunks per
+    worker in flight. Each prepared chunk goes to ``store`` (by default
+    ``URLService.import_links``), which allocates codes and writes the
+    chunk with one storage call. Only the chunks in flight are held in
+    memory, however long the input is.
+    """
+
+    def __init__(self, url_service, batch_size: int = 5000, workers: int = 0,
+                 store: Callable[[List[Row]], List[Tuple[int, str]]] = None):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.store = store or url_service.import_links
+
+    def run(self, lines: Iterable[str], fmt: str) -> Iterator[List[Dict[str, Any]]]:
+        """Import everything; yields the events of each batch: one
+        ``{"row", "error"}`` per rejected row, then a progress event. The
+        last progress event has ``"done": True``."""
+        started = time.perf_counter()
+        totals = {"rows": 0, "imported": 0, "errors": 0}
+        rows = read_rows(lines, fmt)
+        chunks = iter(lambda: list(islice(rows, self.batch_size)), [])
+        for prepared in self._prepare(chunks):
+            errors = [(number, error) for number, _, error in prepared if error is not None]
+            valid = [row for row in prepared if row[2] is None]
+            errors.extend(self.store(valid))
+            errors.sort()
+            totals["rows"] += len(prepared)
+            totals["errors"] += len(errors)
+            totals["imported"] += len(prepared) - len(errors)
+            events = [{"row": number, "error": error} for number, error in errors]
+            events.append(self._progress(totals, started, False))
+            yield events
+        yield [self._progress(totals, started, True)]
+
+    def _prepare(self, chunks: Iterator[List[Row]]) -> Iterator[List[Row]]:
+        if self.workers <= 0:
+            for chunk in chunks:
+                yield prepare_rows(chunk)
+            return
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Spawn, not fork: the service's I/O thread may hold a lock mid-fork
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=spawn) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(prepare_rows, chunk))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @staticmethod
+    def _progress(totals: Dict[str, int], started: float, done: bool) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return {
+            **totals,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(totals["rows"] / elapsed) if elapsed > 0 else None,
+            "done": done
+        }
@@ -0,0 +1,145 @@
+"""
+Memory and disk caches of rendered QR codes
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+# (encoded content, render options)
+QRKey = Tuple[str, Hashable]
+
+
+class QRCache:
+    """LRU cache of rendered QR images, bounded by their total size.
+
+    Entries are keyed by the encoded content and the render options, so
+    every variant of a link's code is cached separately and ``invalidate``
+    drops them all at once. Images that were rendered record how long the
+    render took; the average is used to report the time hits saved.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[QRKey, bytes]" = OrderedDict()
+        self._variants: Dict[str, Set[QRKey]] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+
+    def get(self, content: str, options: Hashable) -> Optional[bytes]:
+        key = (content, options)
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, content: str, options: Hashable, image: bytes,
+            render_seconds: Optional[float] = None) -> None:
+        """Cache an image along with the time it took to render, or None
+        when it was not rendered (read from the disk cache)"""
+        key = (content, options)
+        with self._lock:
+            if render_seconds is not None:
+                self.renders += 1
+                self.render_seconds += render_seconds
+            if len(image) > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[key] = image
+            self._variants.setdefault(content, set()).add(key)
+            self.bytes += len(image)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, content: str) -> None:
+        """Drop every cached variant for some content"""
+        with self._lock:
+            for key in list(self._variants.get(content, ())):
+                self._remove(key)
+
+    def _remove(self, key: QRKey) -> None:
+        self.bytes -= len(self._entries.pop(key))
+        variants = self._variants[key[0]]
+        variants.discard(key)
+        if not variants:
+            del self._variants[key[0]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        average = self.render_seconds / self.renders if self.renders else 0.0
+        return {
+            "max_bytes": self.max_bytes,
+            "bytes": self.bytes,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "avg_render_ms": round(average * 1000, 3),
+            "time_saved_ms": round(self.hits * average * 1000, 1)
+        }
+
+
+class QRDiskCache:
+    """Rendered QR images on disk, one file per content address (see
+    ``qr_render.qr_key``), shared by every worker and kept across restarts.
+
+    Files are written atomically and never change once written; deleted
+    links remove theirs with ``discard``.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{fmt}")
+
+    def get(self, key: str, fmt: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key, fmt), 'rb') as f:
+                image = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return image
+
+    def put(self, key: str, fmt: str, image: bytes) -> None:
+        path = self._path(key, fmt)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+            self.writes += 1
+        except OSError as e:
+            print(f"Error caching QR code: {e}")
+
+    def discard(self, key: str, fmt: str) -> None:
+        try:
+            os.remove(self._path(key, fmt))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"directory": self.directory, "hits": self.hits, "misses": self.misses,
+                "writes": self.writes}
@@ -0,0 +1,57 @@
+"""
+Streamed ZIP archives of QR codes
+"""
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+
+class _Chunks:
+    """Write-only file that hands out what has been written so far, letting
+    ``ZipFile`` stream an archive it would otherwise build in memory"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def qr_zip(url_service, short_codes: Iterable[str], fmt: str = "png",
+           chunk_size: int = 32) -> Iterator[bytes]:
+    """ZIP of ``<short_code>.<fmt>`` QR codes, yielded a piece at a time.
+
+    Codes are looked up and rendered ``chunk_size`` at a time, in parallel
+    on the QR render pool, and each chunk is written out before the next
+    is rendered, so memory stays flat however many codes are asked for.
+    Unknown or expired codes are listed in a trailing ``missing.txt``.
+    """
+    import zipfile  # deferred: only exports need it
+
+    out = _Chunks()
+    # PNGs are already compressed; SVG text shrinks several times over
+    compression = zipfile.ZIP_DEFLATED if fmt == "svg" else zipfile.ZIP_STORED
+    codes = iter(dict.fromkeys(short_codes))
+    missing = []
+    with zipfile.ZipFile(out, "w", compression) as archive:
+        for chunk in iter(lambda: list(islice(codes, chunk_size)), []):
+            found = []
+            for short_code in chunk:
+                if "error" in url_service.get_url_info(short_code):
+                    missing.append(short_code)
+                else:
+                    found.append(short_code)
+            urls = [f"{url_service.base_url}/{short_code}" for short_code in found]
+            for short_code, image in zip(found, url_service.qr_images(urls, fmt)):
+                archive.writestr(f"{short_code}.{fmt}", image)
+            yield out.take()
+        if missing:
+            archive.writestr("missing.txt", "\n".join(missing) + "\n")
+    yield out.take()
@@ -0,0 +1,139 @@
+"""
+Renders QR codes off the event loop, in worker processes
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future, TimeoutError
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.services.qr_render import render_qr
+
+# (content, format, box size, border): the arguments of render_qr
+RenderJob = Tuple[str, str, int, int]
+
+
+class QRRenderPool:
+    """Runs ``render_qr`` in ``workers`` processes, so rendering neither
+    holds the GIL of the serving process nor blocks its event loop.
+
+    A render that takes longer than ``timeout`` seconds, or fails because
+    the pool broke, is rendered again in the calling thread. With
+    workers == 0, or where processes cannot be started (some serverless
+    runtimes), everything renders in the calling thread, and async callers
+    render on a thread instead of the event loop.
+    """
+
+    def __init__(self, workers: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.rendered = 0
+        self.inline = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def _executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                try:
+                    # Imported here to keep multiprocessing out of startup
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    # Spawn, not fork: forking copies the I/O thread's locks
+                    # and the storage handles of a threaded server
+                    self._pool = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("spawn"))
+                except (OSError, NotImplementedError, ImportError) as e:
+                    print(f"QR render processes unavailable, rendering inline: {e}")
+                    self.workers = 0
+            return self._pool
+
+    def _submit(self, job: RenderJob) -> Optional[Future]:
+        pool = self._executor()
+        if pool is None:
+            return None
+        try:
+            return pool.submit(render_qr, *job)
+        except (BrokenExecutor, RuntimeError) as e:
+            self._broken(e)
+            return None
+
+    def _broken(self, error: Exception) -> None:
+        """Drop a pool whose worker died; the next render starts a new one"""
+        print(f"QR render pool failed, rendering inline: {error}")
+        self.failures += 1
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def _result(self, future: Optional[Future], job: RenderJob) -> bytes:
+        if future is not None:
+            try:
+                image = future.result(timeout=self.timeout)
+                self.rendered += 1
+                return image
+            except TimeoutError:
+                future.cancel()
+                self.timeouts += 1
+            except BrokenExecutor as e:
+                self._broken(e)
+        self.inline += 1
+        return render_qr(*job)
+
+    def render(self, content: str, fmt: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+        """Render one QR code, waiting for a worker"""
+        job = (content, fmt, box_size, border)
+        return self._result(self._submit(job), job)
+
+    async def render_async(self, content: str, fmt: str = "png", box_size: int = 10,
+                           border: int = 4) -> bytes:
+        """Render one QR code without blocking the event loop"""
+        job = (content, fmt, box_size, border)
+        future = self._submit(job)
+        if future is not None:
+            try:
+                image = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+                self.rendered += 1
+                return image
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+            except BrokenExecutor as e:
+                self._broken(e)
+        self.inline += 1
+        return await asyncio.to_thread(render_qr, *job)
+
+    def render_many(self, jobs: Iterable[RenderJob]) -> Iterator[bytes]:
+        """Render a stream of QR codes across all workers, yielding images
+        in input order with at most four jobs per worker in flight"""
+        if self._executor() is None:
+            for job in jobs:
+                self.inline += 1
+                yield render_qr(*job)
+            return
+        pending = deque()
+        for job in jobs:
+            pending.append((self._submit(job), job))
+            if len(pending) >= self.workers * 4:
+                yield self._result(*pending.popleft())
+        while pending:
+            yield self._result(*pending.popleft())
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "rendered": self.rendered,
+            "inline": self.inline,
+            "timeouts": self.timeouts,
+            "failures": self.failures
+        }
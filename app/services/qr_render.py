@@ -0,0 +1,47 @@
+"""
+QR code rendering
+"""
+import functools
+import hashlib
+import io
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+@functools.lru_cache(maxsize=None)
+def renderer() -> str:
+    """Renderer version, part of every cache key so an upgrade never serves
+    stale images"""
+    from importlib.metadata import version
+    return f"qrcode-{version('qrcode')}"
+
+
+def render_qr(content: str, fmt: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+    """Render a QR code as PNG or SVG bytes"""
+    # Imported here: qrcode and Pillow add tens of milliseconds to startup,
+    # and most cold starts only serve redirects
+    import qrcode
+    import qrcode.image.svg
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(content)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    if fmt == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def qr_key(content: str, fmt: str = "png", box_size: int = 10, border: int = 4) -> str:
+    """Content address of a rendered QR code: the same inputs always render
+    the same bytes, so this doubles as a strong ETag"""
+    source = f"{renderer()}\0{fmt}\0{box_size}\0{border}\0{content}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
@@ -0,0 +1,87 @@
+"""
+Columnar copy of the numeric URL record fields for vectorized stats
+"""
+from typing import Dict, List
+
+from app.models.url_record import URLRecord
+
+# Optional; stats fall back to scanning the records. Imported by
+# available(), on first use, since NumPy is slow to import.
+np = None
+
+# Values written to a freed row so it drops out of every reduction
+_EMPTY = {"clicks": 0, "created_at": -1, "expires_at": -1, "last_accessed": -1}
+
+
+class RecordColumns:
+    """``clicks``, ``created_at``, ``expires_at`` and ``last_accessed`` of
+    every record in parallel NumPy arrays indexed by row id.
+
+    Rows of deleted records are reset to values that no reduction counts and
+    reused by the next insert, so the arrays never need compacting.
+    """
+
+    FIELDS = tuple(_EMPTY)
+
+    def __init__(self, capacity: int = 1024):
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._arrays = {name: np.full(capacity, empty, dtype=np.int64)
+                        for name, empty in _EMPTY.items()}
+
+    @staticmethod
+    def available() -> bool:
+        global np
+        if np is None:
+            try:
+                import numpy
+            except ImportError:
+                return False
+            np = numpy
+        return True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def set(self, short_code: str, record: URLRecord) -> None:
+        row = self._rows.get(short_code)
+        if row is None:
+            row = self._rows[short_code] = self._allocate()
+        arrays = self._arrays
+        arrays["clicks"][row] = record.clicks
+        arrays["created_at"][row] = record.created_at
+        arrays["expires_at"][row] = record.expires_at
+        arrays["last_accessed"][row] = -1 if record.last_accessed is None else record.last_accessed
+
+    def discard(self, short_code: str) -> None:
+        row = self._rows.pop(short_code, None)
+        if row is None:
+            return
+        for name, empty in _EMPTY.items():
+            self._arrays[name][row] = empty
+        self._free.append(row)
+
+    def summary(self, now: float, recent_window: int) -> Dict[str, int]:
+        """Totals, links created within ``recent_window`` seconds and links
+        not expired at ``now``"""
+        size = self._size
+        return {
+            "total_urls": len(self._rows),
+            "total_clicks": int(self._arrays["clicks"][:size].sum()),
+            "recent_urls": int(np.count_nonzero(self._arrays["created_at"][:size] > now - recent_window)),
+            "active_urls": int(np.count_nonzero(self._arrays["expires_at"][:size] >= now))
+        }
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        row = self._size
+        capacity = len(self._arrays["clicks"])
+        if row == capacity:
+            for name, empty in _EMPTY.items():
+                grown = np.full(capacity * 2, empty, dtype=np.int64)
+                grown[:capacity] = self._arrays[name]
+                self._arrays[name] = grown
+        self._size += 1
+        return row
@@ -0,0 +1,163 @@
+"""
+Bounded in-process cache of resolved redirects
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi.responses import Response
+
+# Same escaping as Starlette's RedirectResponse
+_LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+
+# Byte -> byte >> 1, so the sketch halves every counter with one translate()
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+class Redirect:
+    """A resolved target with its 302 headers encoded once"""
+
+    __slots__ = ("long_url", "expires_at", "raw_headers")
+
+    def __init__(self, long_url: str, expires_at: int):
+        self.long_url = long_url
+        self.expires_at = expires_at
+        self.raw_headers: List[Tuple[bytes, bytes]] = [
+            (b"content-length", b"0"),
+            (b"location", quote(long_url, safe=_LOCATION_SAFE).encode("latin-1"))
+        ]
+
+    def response(self) -> Response:
+        response = Response(status_code=302)
+        response.raw_headers = list(self.raw_headers)
+        return response
+
+
+class FrequencySketch:
+    """Count-min sketch of recent access counts (the TinyLFU filter).
+
+    Four counters per key, each capped at 15; every ``sample_size``
+    increments all counters are halved so old popularity fades.
+    """
+
+    MAX_COUNT = 15
+    # One multiplicative hash per row, so rows collide independently
+    SEEDS = (0xc3a5c85c97cb3127, 0xb492b66fbe98f273, 0x9ae16a3b2f90404f, 0xcbf29ce484222325)
+
+    def __init__(self, capacity: int):
+        width_bits = 6
+        while 1 << width_bits < capacity * 8:
+            width_bits += 1
+        self._width = 1 << width_bits
+        self._shift = 64 - width_bits
+        self._table = bytearray(self._width * len(self.SEEDS))
+        self._sample_size = max(10 * capacity, 64)
+        self._additions = 0
+
+    def increment(self, key: str) -> None:
+        table = self._table
+        for slot in self._slots(key):
+            if table[slot] < self.MAX_COUNT:
+                table[slot] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._table = table.translate(_HALVE)
+            self._additions //= 2
+
+    def estimate(self, key: str) -> int:
+        table = self._table
+        return min(table[slot] for slot in self._slots(key))
+
+    def _slots(self, key: str):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        width, shift = self._width, self._shift
+        return (row * width + (((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift)
+                for row, seed in enumerate(self.SEEDS))
+
+
+class RedirectCache:
+    """LRU cache of redirects for links without a password, with TinyLFU
+    admission.
+
+    Once full, a new code only replaces the least recently used entry if it
+    has been requested more often recently, so a burst of one-off codes
+    (scans, crawlers) cannot flush out the hot set. Entries carry the link's
+    expiry and are dropped when it passes; ``invalidate`` removes deleted or
+    changed links.
+
+    ``generation`` counts invalidations. A caller reads it before reading a
+    link and passes it to ``put``, which caches nothing if an invalidation
+    ran in between: the link read may already be deleted or changed.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, Redirect]" = OrderedDict()
+        self._sketch = FrequencySketch(capacity) if capacity > 0 else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+    def get(self, short_code: str, now: float) -> Optional[Redirect]:
+        if self._sketch is None:
+            return None
+        with self._lock:
+            self._sketch.increment(short_code)
+            redirect = self._entries.get(short_code)
+            if redirect is not None and now > redirect.expires_at:
+                del self._entries[short_code]
+                redirect = None
+            if redirect is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(short_code)
+            self.hits += 1
+            return redirect
+
+    def put(self, short_code: str, long_url: str, expires_at: int,
+            generation: Optional[int] = None) -> Redirect:
+        """Build the redirect for a link and cache it if admitted and no
+        invalidation happened since ``generation``"""
+        redirect = Redirect(long_url, expires_at)
+        if self._sketch is None:
+            return redirect
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return redirect
+            entries = self._entries
+            if short_code not in entries and len(entries) >= self.capacity:
+                victim = next(iter(entries))
+                if self._sketch.estimate(short_code) <= self._sketch.estimate(victim):
+                    return redirect
+                del entries[victim]
+                self.evictions += 1
+            entries[short_code] = redirect
+            entries.move_to_end(short_code)
+        return redirect
+
+    def invalidate(self, short_code: str) -> None:
+        with self._lock:
+            self._entries.pop(short_code, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions
+        }
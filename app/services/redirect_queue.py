@@ -0,0 +1,123 @@
+"""
+Bounded queue for work done after a redirect has been answered
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+POLICIES = ("drop", "block")
+
+# (short_code, accessed_at epoch, enqueued monotonic time)
+Event = Tuple[str, int, float]
+
+
+class RedirectQueue:
+    """Click events handed off by redirects and applied in batches by a
+    background consumer, so the 302 goes out right after the lookup.
+
+    When the queue is full, the ``drop`` policy discards the event and
+    counts it, and ``block`` makes the redirect wait for space. Until
+    ``run()`` is consuming on the event loop, ``running`` is False and
+    callers apply their side effects inline instead. Queued clicks are
+    also tallied per short code (``pending``) so counts read while they
+    wait stay exact.
+    """
+
+    def __init__(self, maxsize: int, policy: str = "drop", batch_size: int = 500):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown redirect queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        # short_code -> [queued clicks, latest accessed_at]
+        self._pending: Dict[str, List[int]] = {}
+        self.running = False
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def pending(self, short_code: str) -> Optional[Tuple[int, int]]:
+        """Queued (clicks, latest accessed_at) for a short code, if any"""
+        entry = self._pending.get(short_code)
+        return (entry[0], entry[1]) if entry else None
+
+    def offer(self, short_code: str, accessed_at: int) -> bool:
+        """Enqueue without waiting; False if the event was dropped"""
+        try:
+            self._queue.put_nowait((short_code, accessed_at, time.monotonic()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self._enqueued(short_code, accessed_at)
+        return True
+
+    async def put(self, short_code: str, accessed_at: int) -> bool:
+        """Enqueue, waiting for space under the ``block`` policy"""
+        if self.policy == "block":
+            await self._queue.put((short_code, accessed_at, time.monotonic()))
+            self._enqueued(short_code, accessed_at)
+            return True
+        return self.offer(short_code, accessed_at)
+
+    def _enqueued(self, short_code: str, accessed_at: int) -> None:
+        self.enqueued += 1
+        entry = self._pending.setdefault(short_code, [0, accessed_at])
+        entry[0] += 1
+        entry[1] = max(entry[1], accessed_at)
+
+    async def run(self, handler: Callable[[List[Event]], None]) -> None:
+        """Consume events in batches until cancelled; events still queued
+        are handed to ``handler`` before returning"""
+        self._queue = asyncio.Queue(self.maxsize)
+        self.running = True
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                self._apply(handler, batch)
+        finally:
+            self.running = False
+            leftover = []
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+            if leftover:
+                self._apply(handler, leftover)
+
+    def _apply(self, handler: Callable[[List[Event]], None], batch: List[Event]) -> None:
+        self.lag = time.monotonic() - batch[0][2]
+        self.max_lag = max(self.max_lag, self.lag)
+        try:
+            handler(batch)
+        except Exception as e:
+            print(f"Error applying redirect events: {e}")
+        pending = self._pending
+        for short_code, _, _ in batch:
+            entry = pending[short_code]
+            entry[0] -= 1
+            if not entry[0]:
+                del pending[short_code]
+        self.processed += len(batch)
+        self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "lag_ms": round(self.lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3)
+        }
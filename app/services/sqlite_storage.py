@@ -0,0 +1,364 @@
+"""
+SQLite storage backend for URL records
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models.url_record import NEVER, URLRecord, to_epoch
+from app.services.stats_aggregates import RECENT_WINDOW
+from app.services.storage import JSONStorage, StorageBackend
+
+COLUMNS = (
+    "short_code", "long_url", "description", "created_at", "clicks",
+    "is_supabase", "file_type", "domain", "expiry_date", "password_hash",
+    "last_accessed"
+)
+TIMESTAMP_COLUMNS = ("created_at", "expiry_date", "last_accessed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    short_code TEXT PRIMARY KEY,
+    long_url TEXT NOT NULL,
+    description TEXT,
+    created_at INTEGER NOT NULL,
+    clicks INTEGER NOT NULL DEFAULT 0,
+    is_supabase INTEGER NOT NULL DEFAULT 0,
+    file_type TEXT,
+    domain TEXT,
+    expiry_date INTEGER,
+    password_hash TEXT,
+    last_accessed INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_urls_created_at ON urls (created_at, short_code);
+CREATE INDEX IF NOT EXISTS idx_urls_domain ON urls (domain);
+CREATE INDEX IF NOT EXISTS idx_urls_file_type ON urls (file_type);
+CREATE INDEX IF NOT EXISTS idx_urls_expiry_date ON urls (expiry_date);
+
+-- Change feed so each worker process can tell which links others modified.
+-- Click counters are left out: they do not affect what a worker caches.
+CREATE TABLE IF NOT EXISTS url_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    short_code TEXT NOT NULL,
+    changed_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now'))
+);
+CREATE TRIGGER IF NOT EXISTS trg_urls_insert AFTER INSERT ON urls BEGIN
+    INSERT INTO url_changes (short_code) VALUES (NEW.short_code);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_urls_delete AFTER DELETE ON urls BEGIN
+    INSERT INTO url_changes (short_code) VALUES (OLD.short_code);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_urls_update
+AFTER UPDATE OF long_url, description, file_type, domain, expiry_date, password_hash ON urls BEGIN
+    INSERT INTO url_changes (short_code) VALUES (NEW.short_code);
+END;
+"""
+
+# Statements are kept as constants so sqlite3's statement cache reuses the
+# compiled form on every call
+SELECT_ONE = f"SELECT {', '.join(COLUMNS)} FROM urls WHERE short_code = ?"
+SELECT_BATCH = (
+    f"SELECT {', '.join(COLUMNS)} FROM urls WHERE short_code > ? "
+    "ORDER BY short_code LIMIT ?"
+)
+SELECT_NEWEST = (
+    f"SELECT {', '.join(COLUMNS)} FROM urls "
+    "ORDER BY created_at DESC, short_code DESC LIMIT ? OFFSET ?"
+)
+SELECT_NEWEST_BEFORE = (
+    f"SELECT {', '.join(COLUMNS)} FROM urls WHERE (created_at, short_code) < (?, ?) "
+    "ORDER BY created_at DESC, short_code DESC LIMIT ? OFFSET ?"
+)
+SELECT_EXPIRED = (
+    "SELECT short_code FROM urls WHERE expiry_date < ? ORDER BY expiry_date LIMIT ?"
+)
+SELECT_EXISTS = "SELECT 1 FROM urls WHERE short_code = ?"
+SELECT_COUNT = "SELECT COUNT(*) FROM urls"
+SELECT_SUMMARY = (
+    "SELECT COUNT(*), COALESCE(SUM(clicks), 0), COALESCE(SUM(created_at > ?), 0), "
+    "COALESCE(SUM(expiry_date IS NULL OR expiry_date >= ?), 0) FROM urls"
+)
+UPSERT = (
+    f"INSERT OR REPLACE INTO urls ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+INSERT = (
+    f"INSERT INTO urls ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)})"
+)
+DELETE = "DELETE FROM urls WHERE short_code = ?"
+ADD_CLICKS = (
+    "UPDATE urls SET clicks = clicks + ?, last_accessed = ? WHERE short_code = ?"
+)
+SELECT_CHANGES = "SELECT seq, short_code FROM url_changes WHERE seq > ? ORDER BY seq"
+SELECT_LAST_CHANGE = "SELECT COALESCE(MAX(seq), 0) FROM url_changes"
+PRUNE_CHANGES = "DELETE FROM url_changes WHERE changed_at < ?"
+
+# How long change feed rows are kept for workers that have not caught up
+CHANGE_RETENTION_SECONDS = 3600
+
+
+class SQLiteStorage(StorageBackend):
+    """URL records stored in a SQLite database.
+
+    Only the rows being read are held in memory, and the database runs in WAL
+    mode so several worker processes can share one file. Triggers record
+    every changed link in ``url_changes``, which ``refresh()`` reads to tell
+    this process what other workers modified. Timestamps are stored as
+    integer epoch seconds and converted to ISO strings on read.
+
+    If the database is empty and a JSON store exists at ``legacy_file``, its
+    records are imported on first start.
+    """
+
+    shared = True
+
+    def __init__(self, db_file: str, legacy_file: Optional[str] = None):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self.log_entries = 0
+        self.checkpointed_at = time.time()
+        self._last_change = self._conn.execute(SELECT_LAST_CHANGE).fetchone()[0]
+
+        if legacy_file and len(self) == 0 and (
+                os.path.exists(legacy_file) or os.path.exists(f"{legacy_file}.log")):
+            self._import_json(legacy_file)
+
+    # Mapping interface
+
+    def __getitem__(self, short_code: str) -> URLRecord:
+        with self._lock:
+            row = self._conn.execute(SELECT_ONE, (short_code,)).fetchone()
+        if row is None:
+            raise KeyError(short_code)
+        return self._to_record(row)
+
+    def __setitem__(self, short_code: str, record: URLRecord) -> None:
+        with self._lock:
+            self._conn.execute(UPSERT, self._to_row(short_code, record))
+            self.log_entries += 1
+
+    def __delitem__(self, short_code: str) -> None:
+        with self._lock:
+            if self._conn.execute(DELETE, (short_code,)).rowcount == 0:
+                raise KeyError(short_code)
+            self.log_entries += 1
+
+    def __contains__(self, short_code: object) -> bool:
+        with self._lock:
+            return self._conn.execute(SELECT_EXISTS, (short_code,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (code for code, _ in self.items())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(SELECT_COUNT).fetchone()[0]
+
+    def get(self, short_code: str, default: Any = None) -> Any:
+        try:
+            return self[short_code]
+        except KeyError:
+            return default
+
+    def items(self, batch_size: int = 1000) -> Iterator[Tuple[str, URLRecord]]:
+        """Stream (short code, record) pairs in primary key order, one batch
+        of rows in memory at a time"""
+        last_code = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(SELECT_BATCH, (last_code, batch_size)).fetchall()
+            for row in rows:
+                yield row[0], self._to_record(row)
+            if len(rows) < batch_size:
+                return
+            last_code = rows[-1][0]
+
+    def values(self) -> Iterator[URLRecord]:
+        return (record for _, record in self.items())
+
+    def patch(self, short_code: str, **fields: Any) -> None:
+        """Update some fields of an existing record, given in dict shape"""
+        unknown = set(fields) - set(COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown URL fields: {', '.join(sorted(unknown))}")
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        values = [self._to_column(name, value) for name, value in fields.items()]
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE urls SET {assignments} WHERE short_code = ?",
+                (*values, short_code)
+            )
+            self.log_entries += 1
+
+    def add_clicks(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """Apply a batch of click increments in one transaction"""
+        params = [(clicks, to_epoch(last), code) for code, (clicks, last) in deltas.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(ADD_CLICKS, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.log_entries += 1
+
+    def put_many(self, records: Dict[str, URLRecord]) -> None:
+        """Store a batch of records in one transaction"""
+        rows = [self._to_row(code, record) for code, record in records.items()]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(UPSERT, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.log_entries += 1
+
+    def insert_many(self, records: Dict[str, URLRecord]) -> List[str]:
+        """Insert new links in one transaction; the primary key rejects
+        codes another process stored first, which are returned"""
+        taken = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for code, record in records.items():
+                    try:
+                        self._conn.execute(INSERT, self._to_row(code, record))
+                    except sqlite3.IntegrityError:
+                        taken.append(code)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if len(taken) < len(records):
+                self.log_entries += 1
+        return taken
+
+    def purge_expired(self, before: int, limit: int) -> List[str]:
+        """Delete one batch of expired links in a single transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                codes = [row[0] for row in self._conn.execute(SELECT_EXPIRED, (before, limit))]
+                self._conn.executemany(DELETE, [(code,) for code in codes])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if codes:
+                self.log_entries += 1
+        return codes
+
+    def newest(self, limit: Optional[int] = None, offset: int = 0,
+               before: Optional[Tuple[int, str]] = None) -> List[URLRecord]:
+        """Walk the (created_at, short_code) index backwards"""
+        params = (-1 if limit is None else limit, offset)
+        with self._lock:
+            if before is None:
+                rows = self._conn.execute(SELECT_NEWEST, params).fetchall()
+            else:
+                rows = self._conn.execute(SELECT_NEWEST_BEFORE, (*before, *params)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def summarize(self, now: float, recent_window: int = RECENT_WINDOW) -> Dict[str, int]:
+        """Totals and window counts computed by SQLite in one pass"""
+        with self._lock:
+            row = self._conn.execute(SELECT_SUMMARY, (now - recent_window, now)).fetchone()
+        return dict(zip(("total_urls", "total_clicks", "recent_urls", "active_urls"), row))
+
+    # Persistence
+
+    def refresh(self) -> Optional[List[str]]:
+        """Short codes changed by any process since the last call"""
+        with self._lock:
+            rows = self._conn.execute(SELECT_CHANGES, (self._last_change,)).fetchall()
+        if not rows:
+            return []
+        if rows[0][0] > self._last_change + 1 and self._last_change:
+            # A gap means rows were pruned before we read them (or a write
+            # rolled back); report everything as possibly changed to be safe
+            self._last_change = rows[-1][0]
+            return None
+        self._last_change = rows[-1][0]
+        return list({code for _, code in rows})
+
+    def compact(self) -> None:
+        """Checkpoint the WAL into the main database file"""
+        with self._lock:
+            self._conn.execute(PRUNE_CHANGES, (int(time.time()) - CHANGE_RETENTION_SECONDS,))
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.log_entries = 0
+            self.checkpointed_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        """Database and WAL metrics for monitoring"""
+        wal_file = f"{self.db_file}-wal"
+        return {
+            "backend": "sqlite",
+            "records": len(self),
+            "snapshot_age_seconds": round(time.time() - self.checkpointed_at, 1),
+            "log_entries": self.log_entries,
+            "log_bytes": os.path.getsize(wal_file) if os.path.exists(wal_file) else 0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _import_json(self, legacy_file: str) -> None:
+        legacy = JSONStorage(legacy_file)
+        rows = [self._to_row(code, record) for code, record in legacy.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(UPSERT, rows)
+            self._conn.execute("COMMIT")
+        print(f"Imported {len(rows)} URLs from {legacy_file}")
+
+    @staticmethod
+    def _to_column(name: str, value: Any) -> Any:
+        if name in TIMESTAMP_COLUMNS:
+            return to_epoch(value)
+        if name == "is_supabase":
+            return int(bool(value))
+        if name == "clicks":
+            return value or 0
+        return value
+
+    @staticmethod
+    def _to_row(short_code: str, record: URLRecord) -> Tuple:
+        return (
+            short_code, record.long_url, record.description, record.created_at,
+            record.clicks, int(record.is_supabase), record.file_type, record.domain,
+            None if record.expires_at == NEVER else record.expires_at,
+            record.password_hash, record.last_accessed
+        )
+
+    @staticmethod
+    def _to_record(row: Tuple) -> URLRecord:
+        (short_code, long_url, description, created_at, clicks, is_supabase,
+         file_type, domain, expires_at, password_hash, last_accessed) = row
+        return URLRecord(
+            short_code=short_code,
+            long_url=long_url,
+            created_at=created_at,
+            description=description,
+            clicks=clicks,
+            is_supabase=bool(is_supabase),
+            file_type=file_type,
+            domain=domain,
+            expires_at=NEVER if expires_at is None else expires_at,
+            password_hash=password_hash,
+            last_accessed=last_accessed
+        )
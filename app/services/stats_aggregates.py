@@ -0,0 +1,87 @@
+"""
+Running totals behind the usage statistics
+"""
+import heapq
+import math
+from typing import Dict, List, Optional
+
+from app.models.url_record import URLRecord
+
+# Links created within this many seconds count as recent
+RECENT_WINDOW = 7 * 24 * 3600
+
+
+class _AgingCounter:
+    """Number of keys above a cutoff that only moves forward.
+
+    Keys are integer epoch seconds bucketed by value; advancing the cutoff
+    pops the buckets it passes from a min-heap, so each bucket ages out once
+    instead of being rescanned on every read.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._counts: Dict[int, int] = {}
+        self._heap: List[int] = []
+        self._cutoff = -1
+
+    def add(self, key: int, delta: int) -> None:
+        if key <= self._cutoff:
+            return
+        count = self._counts.get(key, 0) + delta
+        if count:
+            if key not in self._counts:
+                heapq.heappush(self._heap, key)
+            self._counts[key] = count
+        else:
+            # A stale heap entry stays behind and pops as zero later
+            self._counts.pop(key, None)
+        self.total += delta
+
+    def advance(self, cutoff: int) -> None:
+        if cutoff <= self._cutoff:
+            return
+        self._cutoff = cutoff
+        heap = self._heap
+        while heap and heap[0] <= cutoff:
+            self.total -= self._counts.pop(heapq.heappop(heap), 0)
+
+
+class StatsAggregates:
+    """Link and click totals plus the recent and active counts, updated on
+    every record change so reading them is O(1) amortized.
+
+    "Recent" links were created within ``recent_window`` seconds; "active"
+    links have not expired. Both age out through ``_AgingCounter`` buckets.
+    """
+
+    def __init__(self, recent_window: int = RECENT_WINDOW):
+        self.recent_window = recent_window
+        self.total_urls = 0
+        self.total_clicks = 0
+        self._recent = _AgingCounter()
+        self._active = _AgingCounter()
+
+    def update(self, old: Optional[URLRecord], new: Optional[URLRecord]) -> None:
+        """Account for a record being added, replaced or removed"""
+        if old is not None:
+            self._add(old, -1)
+        if new is not None:
+            self._add(new, 1)
+
+    def summary(self, now: float) -> Dict[str, int]:
+        # created_at > now - window, and expires_at >= now, on integer seconds
+        self._recent.advance(math.floor(now - self.recent_window))
+        self._active.advance(math.ceil(now) - 1)
+        return {
+            "total_urls": self.total_urls,
+            "total_clicks": self.total_clicks,
+            "recent_urls": self._recent.total,
+            "active_urls": self._active.total
+        }
+
+    def _add(self, record: URLRecord, sign: int) -> None:
+        self.total_urls += sign
+        self.total_clicks += sign * record.clicks
+        self._recent.add(record.created_at, sign)
+        self._active.add(record.expires_at, sign)
@@ -0,0 +1,691 @@
+"""
+Storage engines for URL records
+"""
+import heapq
+import json
+import os
+import threading
+import time
+import uuid
+from abc import abstractmethod
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.url_record import NEVER, URLRecord, to_epoch
+from app.services.created_index import CreatedIndex
+from app.services.record_columns import RecordColumns
+from app.services.stats_aggregates import RECENT_WINDOW, StatsAggregates
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; shared stores are unavailable there
+    fcntl = None
+
+SNAPSHOT_VERSION = 2
+
+
+def _dumps(entry: Dict[str, Any]) -> bytes:
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class StorageBackend(MutableMapping):
+    """Mapping of short code to ``URLRecord`` with persistence hooks.
+
+    Records read from a backend must not be mutated; changes go through
+    ``__setitem__``, ``patch`` and ``add_clicks`` so the backend can persist
+    them.
+    """
+
+    # Whether other processes may write to the same store, so ``refresh()``
+    # has to be called to see their changes
+    shared = False
+
+    @abstractmethod
+    def patch(self, short_code: str, **fields: Any) -> None:
+        """Update some fields of an existing record, given in dict shape"""
+
+    @abstractmethod
+    def add_clicks(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """Apply a batch of (clicks, last_accessed epoch) increments"""
+
+    def put_many(self, records: Dict[str, URLRecord]) -> None:
+        """Store a batch of records; backends override this to commit
+        them in one write"""
+        for short_code, record in records.items():
+            self[short_code] = record
+
+    def insert_many(self, records: Dict[str, URLRecord]) -> List[str]:
+        """Store the records whose short codes are not taken and return the
+        codes that were; a stored link is never replaced.
+
+        Checks then writes; backends shared between processes override this
+        to make the check and the write atomic.
+        """
+        taken = [code for code in records if code in self]
+        self.put_many({code: record for code, record in records.items() if code not in taken})
+        return taken
+
+    def purge_expired(self, before: int, limit: int) -> List[str]:
+        """Delete up to ``limit`` links that expired before ``before`` and
+        return their short codes.
+
+        Scans every record; backends override this with an expiry index.
+        """
+        codes = [code for code, record in self.items() if record.expires_at < before][:limit]
+        for code in codes:
+            del self[code]
+        return codes
+
+    @abstractmethod
+    def compact(self) -> None:
+        """Reclaim space used by the write log"""
+
+    def save(self) -> None:
+        """Make all writes so far durable and reset the write log"""
+        self.compact()
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Backend metrics for monitoring"""
+
+    def summarize(self, now: float, recent_window: int = RECENT_WINDOW) -> Dict[str, int]:
+        """Link and click totals, links created within ``recent_window``
+        seconds and links not expired at ``now``.
+
+        Backends override this with something cheaper than ``recount()``.
+        """
+        return self.recount(now, recent_window)
+
+    def recount(self, now: float, recent_window: int = RECENT_WINDOW) -> Dict[str, int]:
+        """``summarize()`` computed by scanning every record"""
+        recent_since = now - recent_window
+        summary = {"total_urls": 0, "total_clicks": 0, "recent_urls": 0, "active_urls": 0}
+        for record in self.values():
+            summary["total_urls"] += 1
+            summary["total_clicks"] += record.clicks
+            if record.created_at > recent_since:
+                summary["recent_urls"] += 1
+            if now <= record.expires_at:
+                summary["active_urls"] += 1
+        return summary
+
+    def newest(self, limit: Optional[int] = None, offset: int = 0,
+               before: Optional[Tuple[int, str]] = None) -> List[URLRecord]:
+        """Records ordered by (created_at, short_code), newest first.
+
+        ``before`` is the key of the last record of the previous page; only
+        records that sort below it are returned (keyset pagination).
+        Sorts every record; backends override this with an index.
+        """
+        records = sorted(self.values(), key=lambda record: (record.created_at, record.short_code),
+                         reverse=True)
+        if before is not None:
+            records = [record for record in records
+                       if (record.created_at, record.short_code) < before]
+        return records[offset:None if limit is None else offset + limit]
+
+    def refresh(self) -> Optional[List[str]]:
+        """Pick up writes made by other processes sharing the store.
+
+        Returns the short codes whose records changed since the last call, or
+        None when the whole store was reloaded and anything may have changed.
+        """
+        return []
+
+    def close(self) -> None:
+        """Release any open handles"""
+
+
+class FileLock:
+    """Exclusive advisory lock on a sidecar file, shared between processes.
+
+    Callers serialise threads with their own lock first; this only orders
+    processes. The holder may acquire it again: it is released when every
+    acquire has been matched. When ``enabled`` is False, or the platform has
+    no ``fcntl`` (Windows), every operation is a no-op.
+    """
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled and fcntl is not None
+        self._fd: Optional[int] = None
+        self._depth = 0
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if not self.enabled:
+            return True
+        if self._depth:
+            self._depth += 1
+            return True
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(self._fd, flags)
+        except BlockingIOError:
+            return False
+        self._depth = 1
+        return True
+
+    def release(self) -> None:
+        if not self.enabled or not self._depth:
+            return
+        self._depth -= 1
+        if not self._depth:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def create_storage(storage_file: str = None) -> StorageBackend:
+    """Create the storage backend selected by ``settings.STORAGE_BACKEND``"""
+    storage_file = storage_file or settings.STORAGE_FILE
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "json":
+        return JSONStorage(storage_file, shared=settings.SHARED_STORE)
+    if backend == "sqlite":
+        from app.services.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(settings.SQLITE_FILE, legacy_file=storage_file)
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+
+class JSONStorage(StorageBackend):
+    """URL records held in memory and persisted as a JSON snapshot plus an
+    append-only mutation log.
+
+    Every mutation appends one compact line to the log, so a write costs the
+    same no matter how many links are stored. The log starts with a header
+    carrying a random id; each snapshot records the id and byte offset of the
+    log it covers. On startup the snapshot (or a legacy ``urls.json``) is
+    loaded and only the part of the log it does not cover is replayed.
+
+    ``compact()`` folds the log into a fresh snapshot. It is safe to call from
+    a worker thread while requests keep mutating the store.
+
+    With ``shared=True`` several processes can use the same files. Appends
+    and log swaps are serialised with ``flock``, every entry is tagged with
+    the writing process, and ``refresh()`` tails the log to apply entries
+    written by the others. When another process compacts, the new log's
+    header names the old log and offset it continues from, so readers carry
+    on without reloading the snapshot.
+
+    A ``CreatedIndex`` keeps the short codes in creation order for
+    ``newest()``, a min-heap of (expires_at, short_code) lets
+    ``purge_expired()`` find expired links without a scan, and
+    ``summarize()`` reads running ``StatsAggregates`` kept up to date by
+    every change, replayed ones included. When NumPy is installed the
+    numeric fields are also mirrored in a ``RecordColumns`` so ``recount()``
+    is a handful of vectorized reductions instead of a scan; the columns
+    are built by the first ``recount()``, keeping NumPy out of startup.
+    """
+
+    def __init__(self, storage_file: str, log_file: Optional[str] = None,
+                 shared: bool = False):
+        if shared and fcntl is None:
+            raise RuntimeError("A shared JSON store needs fcntl file locking, which this platform lacks")
+        self.storage_file = storage_file
+        self.log_file = log_file or f"{storage_file}.log"
+        self.shared = shared
+        self._records: Dict[str, URLRecord] = {}
+        self._columns: Optional[RecordColumns] = None
+        self._aggregates = StatsAggregates()
+        self._created = CreatedIndex()
+        # Entries are not removed when a record changes; stale ones are
+        # skipped when they reach the top
+        self._expiry: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._file_lock = FileLock(f"{self.log_file}.lock", shared)
+        self._compact_file_lock = FileLock(f"{self.log_file}.compact.lock", shared)
+        self._writer_id = uuid.uuid4().hex[:12] if shared else None
+        self._log_id: Optional[str] = None
+        self._log_ino: Optional[int] = None
+        # Offset of the end of the last log line applied to self._records
+        self._log_size = 0
+        self._changed: Optional[set] = set()
+        self.log_entries = 0
+        self.snapshot_saved_at: Optional[float] = None
+        self.load()
+
+    # Mapping interface
+
+    def __getitem__(self, short_code: str) -> URLRecord:
+        return self._records[short_code]
+
+    def __setitem__(self, short_code: str, record: URLRecord) -> None:
+        with self._lock:
+            self._append({"op": "put", "code": short_code, "record": record.to_dict()})
+            self._store(short_code, record)
+
+    def __delitem__(self, short_code: str) -> None:
+        with self._lock:
+            if short_code not in self._records:
+                raise KeyError(short_code)
+            self._append({"op": "del", "code": short_code})
+            self._drop(short_code)
+
+    def __contains__(self, short_code: object) -> bool:
+        return short_code in self._records
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def put_many(self, records: Dict[str, URLRecord]) -> None:
+        """Store a batch of records with one log entry"""
+        if not records:
+            return
+        with self._lock:
+            self._put_many_locked(records)
+
+    def insert_many(self, records: Dict[str, URLRecord]) -> List[str]:
+        """Store the records whose short codes are not taken with one log
+        entry; returns the codes that were.
+
+        The log is read up to its end under the file lock first, so a code
+        another process stored since the last ``refresh()`` counts as taken
+        instead of being overwritten.
+        """
+        while True:
+            with self._lock, self._file_lock:
+                if self._refresh_locked():
+                    taken = [code for code in records if code in self._records]
+                    fresh = {code: record for code, record in records.items()
+                             if code not in self._records}
+                    if fresh:
+                        self._put_many_locked(fresh)
+                    return taken
+            with self._compact_lock, self._compact_file_lock, self._lock, self._file_lock:
+                self._reload_locked()
+
+    def patch(self, short_code: str, **fields: Any) -> None:
+        """Update some fields of an existing record, given in dict shape"""
+        with self._lock:
+            self._append({"op": "set", "code": short_code, "fields": fields})
+            # Records are replaced rather than mutated so that a snapshot
+            # being written concurrently always sees a consistent copy
+            self._set_fields(short_code, fields)
+
+    def add_clicks(self, deltas: Dict[str, Tuple[int, int]]) -> None:
+        """Apply a batch of (clicks, last_accessed) increments in one entry"""
+        with self._lock:
+            counts = {code: list(delta) for code, delta in deltas.items() if code in self._records}
+            if not counts:
+                return
+            self._append({"op": "clicks", "counts": counts})
+            self._apply_clicks(counts)
+
+    # Persistence
+
+    def load(self) -> None:
+        """Load the snapshot and replay the log entries it does not cover"""
+        with self._compact_lock, self._compact_file_lock, self._lock, self._file_lock:
+            self._load_locked()
+
+    def refresh(self) -> Optional[List[str]]:
+        """Apply log entries written by other processes since the last call"""
+        with self._lock:
+            current = self._refresh_locked()
+        if not current:
+            # Reload with every lock load() takes, so no process appends or
+            # compacts while the files are read
+            with self._compact_lock, self._compact_file_lock, self._lock, self._file_lock:
+                self._reload_locked()
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return None if changed is None else list(changed)
+
+    def compact(self) -> None:
+        """Write a point-in-time snapshot and drop the log prefix it covers"""
+        with self._compact_lock:
+            # Only one process compacts at a time; the others skip this round
+            if not self._compact_file_lock.acquire(blocking=False):
+                return
+            try:
+                with self._lock, self._file_lock:
+                    if not self._refresh_locked():
+                        self._reload_locked()
+                    log_id, offset = self._log_id, self._log_size
+                    records = dict(self._records)
+
+                saved_at = self._write_snapshot(records, log_id, offset)
+
+                # The snapshot is in place; now start a new log holding only
+                # the entries appended while it was being written
+                with self._lock, self._file_lock:
+                    if not self._refresh_locked():
+                        self._reload_locked()
+                    with open(self.log_file, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read(self._log_size - offset)
+                    self._start_log(tail, base={"id": log_id, "offset": offset})
+                    self.snapshot_saved_at = saved_at
+            finally:
+                self._compact_file_lock.release()
+
+    def purge_expired(self, before: int, limit: int) -> List[str]:
+        """Pop expired links off the expiry heap and delete them with one
+        log entry"""
+        with self._lock:
+            codes = {}
+            while self._expiry and self._expiry[0][0] < before and len(codes) < limit:
+                expires_at, code = heapq.heappop(self._expiry)
+                record = self._records.get(code)
+                if record is not None and record.expires_at == expires_at:
+                    codes[code] = None
+            if not codes:
+                return []
+            codes = list(codes)
+            self._append({"op": "purge", "codes": codes})
+            for code in codes:
+                self._drop(code)
+        return codes
+
+    def newest(self, limit: Optional[int] = None, offset: int = 0,
+               before: Optional[Tuple[int, str]] = None) -> List[URLRecord]:
+        with self._lock:
+            codes = self._created.newest(limit, offset, before)
+            return [self._records[code] for code in codes]
+
+    def summarize(self, now: float, recent_window: int = RECENT_WINDOW) -> Dict[str, int]:
+        if recent_window != self._aggregates.recent_window:
+            return self.recount(now, recent_window)
+        with self._lock:
+            return self._aggregates.summary(now)
+
+    def recount(self, now: float, recent_window: int = RECENT_WINDOW) -> Dict[str, int]:
+        with self._lock:
+            if self._columns is None and RecordColumns.available():
+                self._columns = RecordColumns(max(1024, len(self._records)))
+                for code, record in self._records.items():
+                    self._columns.set(code, record)
+            if self._columns is not None:
+                return self._columns.summary(now, recent_window)
+        return super().recount(now, recent_window)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot and log metrics for monitoring"""
+        age = None
+        if self.snapshot_saved_at is not None:
+            age = round(time.time() - self.snapshot_saved_at, 1)
+        return {
+            "backend": "json",
+            "shared": self.shared,
+            "records": len(self._records),
+            "snapshot_age_seconds": age,
+            "log_entries": self.log_entries,
+            "log_bytes": self._log_size
+        }
+
+    def _load_locked(self, repair: bool = True) -> None:
+        """Load the store from its files. With ``repair``, done only when the
+        store is opened, a torn final log line is cut off and a log without
+        a header is folded into a snapshot."""
+        self._records = {}
+        self.log_entries = 0
+        self.snapshot_saved_at = None
+        covered_log_id, covered_offset = None, 0
+
+        if os.path.exists(self.storage_file):
+            try:
+                with open(self.storage_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == SNAPSHOT_VERSION and isinstance(data.get("urls"), dict):
+                    records = data.pop("urls")
+                    covered_log_id = data.get("log_id")
+                    covered_offset = data.get("log_offset", 0)
+                    self.snapshot_saved_at = data.get("saved_at")
+                else:
+                    # Legacy urls.json: a plain mapping of short code to record
+                    records = data
+                    self.snapshot_saved_at = os.path.getmtime(self.storage_file)
+                self._records = {
+                    code: URLRecord.from_dict(record, code) for code, record in records.items()
+                }
+            except Exception as e:
+                print(f"Error loading URLs: {e}")
+
+        self._aggregates = StatsAggregates()
+        self._created = CreatedIndex(self._records.values())
+        self._expiry = [(record.expires_at, code) for code, record in self._records.items()
+                        if record.expires_at != NEVER]
+        heapq.heapify(self._expiry)
+        self._columns = None
+        for record in self._records.values():
+            self._aggregates.update(None, record)
+
+        if not os.path.exists(self.log_file):
+            self._start_log()
+            return
+
+        with open(self.log_file, 'rb') as f:
+            self._log_ino = os.fstat(f.fileno()).st_ino
+            header = self._read_header(f)
+            self._log_id = header["id"] if header is not None else None
+            if header is None:
+                f.seek(0)
+            elif covered_log_id == self._log_id:
+                f.seek(covered_offset)
+            # Everything here is missing from the reset records, our own
+            # writes included
+            self._log_size = self._replay_from(f, skip_own=False)
+
+        if not repair:
+            return
+        if header is None:
+            # Log written before headers existed: fold it into a snapshot so
+            # the store has a known layout from here on
+            self.snapshot_saved_at = self._write_snapshot(self._records, None, 0)
+            self._start_log()
+        elif os.path.getsize(self.log_file) > self._log_size:
+            # Drop a torn final line so new entries start on a fresh line
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(self._log_size)
+
+    def _reload_locked(self) -> None:
+        """Reload after another process compacted entries this one had not
+        read yet. The log may end in a line another process is writing, so
+        it is left as it is; callers hold every lock ``load()`` takes."""
+        self._load_locked(repair=False)
+        self._changed = None
+
+    def _refresh_locked(self) -> bool:
+        """Tail the log; False when another process compacted past the
+        entries read here and the store has to be reloaded instead"""
+        if not self.shared:
+            return True
+        try:
+            f = open(self.log_file, 'rb')
+        except FileNotFoundError:
+            return True
+        with f:
+            log_ino = os.fstat(f.fileno()).st_ino
+            if log_ino != self._log_ino:
+                # Another process compacted: continue in the new log if it
+                # picks up where we stopped reading, otherwise reload
+                header = self._read_header(f) or {}
+                base = header.get("base") or {}
+                if base.get("id") != self._log_id or base.get("offset", 0) > self._log_size:
+                    return False
+                f.seek(f.tell() + self._log_size - base["offset"])
+                self._log_id, self._log_ino = header["id"], log_ino
+            else:
+                f.seek(self._log_size)
+            self._log_size = self._replay_from(f)
+        return True
+
+    def _write_snapshot(self, records: Dict[str, URLRecord], log_id: Optional[str],
+                        offset: int) -> float:
+        saved_at = time.time()
+        self._write_atomic(self.storage_file, self._snapshot_chunks(records, {
+            "version": SNAPSHOT_VERSION,
+            "log_id": log_id,
+            "log_offset": offset,
+            "saved_at": saved_at
+        }))
+        return saved_at
+
+    def _start_log(self, tail: bytes = b"", base: Optional[Dict[str, Any]] = None) -> None:
+        """Replace the log with a new one, keeping ``tail`` as its entries"""
+        log_id = uuid.uuid4().hex
+        header = {"op": "log", "id": log_id}
+        if base is not None:
+            header["base"] = base
+        header_line = _dumps(header) + b"\n"
+        self._write_atomic(self.log_file, [header_line, tail])
+        self._log_id = log_id
+        self._log_ino = os.stat(self.log_file).st_ino
+        self._log_size = len(header_line) + len(tail)
+        self.log_entries = tail.count(b"\n")
+
+    def _read_header(self, f) -> Optional[Dict[str, Any]]:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or header.get("op") != "log":
+            return None
+        return header
+
+    def _replay_from(self, f, skip_own: bool = True) -> int:
+        """Replay complete log lines; return the offset just past the last one.
+
+        When tailing (``skip_own``), entries this writer appended are skipped
+        as they were applied when made; a full reload replays them too.
+        """
+        end = f.tell()
+        for line in f:
+            if not line.endswith(b"\n"):
+                # A torn final line from an interrupted write
+                print(f"Skipping unreadable log entry in {self.log_file}")
+                break
+            end += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable log entry in {self.log_file}")
+                continue
+            if skip_own and self._writer_id and entry.get("w") == self._writer_id:
+                # Our own write, already applied when it was made
+                continue
+            self._replay(entry)
+            self.log_entries += 1
+        return end
+
+    def _replay(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        code = entry.get("code")
+        if op == "put":
+            self._store(code, URLRecord.from_dict(entry["record"], code))
+        elif op == "del":
+            self._drop(code)
+        elif op == "set" and code in self._records:
+            self._set_fields(code, entry["fields"])
+        elif op == "clicks":
+            self._apply_clicks(entry["counts"])
+            return
+        elif op == "puts":
+            for code, record in entry["records"].items():
+                self._store(code, URLRecord.from_dict(record, code))
+            if self._changed is not None:
+                self._changed.update(entry["records"])
+            return
+        elif op == "purge":
+            for code in entry["codes"]:
+                self._drop(code)
+            if self._changed is not None:
+                self._changed.update(entry["codes"])
+            return
+        if self._changed is not None and code is not None:
+            self._changed.add(code)
+
+    def _put_many_locked(self, records: Dict[str, URLRecord]) -> None:
+        self._append({"op": "puts", "records": {
+            code: record.to_dict() for code, record in records.items()
+        }})
+        for short_code, record in records.items():
+            self._store(short_code, record)
+
+    def _set_fields(self, short_code: str, fields: Dict[str, Any]) -> None:
+        record = self._records[short_code]
+        self._store(short_code, URLRecord.from_dict({**record.to_dict(), **fields}, short_code))
+
+    def _apply_clicks(self, counts: Dict[str, List]) -> None:
+        for code, (clicks, last_accessed) in counts.items():
+            record = self._records.get(code)
+            if record is not None:
+                self._store(code, record.replace(
+                    clicks=record.clicks + clicks,
+                    last_accessed=to_epoch(last_accessed)
+                ))
+
+    def _store(self, short_code: str, record: URLRecord) -> None:
+        old = self._records.get(short_code)
+        self._aggregates.update(old, record)
+        if old is None or old.created_at != record.created_at:
+            if old is not None:
+                self._created.remove(old.created_at, short_code)
+            self._created.add(record.created_at, short_code)
+        if record.expires_at != NEVER and (old is None or old.expires_at != record.expires_at):
+            heapq.heappush(self._expiry, (record.expires_at, short_code))
+        self._records[short_code] = record
+        if self._columns is not None:
+            self._columns.set(short_code, record)
+
+    def _drop(self, short_code: str) -> None:
+        record = self._records.pop(short_code, None)
+        if record is None:
+            return
+        self._aggregates.update(record, None)
+        self._created.remove(record.created_at, short_code)
+        if self._columns is not None:
+            self._columns.discard(short_code)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if self._writer_id:
+            entry["w"] = self._writer_id
+        line = _dumps(entry) + b"\n"
+        try:
+            with self._file_lock:
+                with open(self.log_file, 'ab') as f:
+                    start = f.tell()
+                    f.write(line)
+                    log_ino = os.fstat(f.fileno()).st_ino
+            # Skip over our own line when nothing unread precedes it; a shared
+            # store otherwise leaves it for refresh() to step over
+            if start == self._log_size and log_ino == self._log_ino:
+                self._log_size += len(line)
+            self.log_entries += 1
+        except Exception as e:
+            print(f"Error saving URLs: {e}")
+
+    @staticmethod
+    def _snapshot_chunks(records: Dict[str, URLRecord], meta: Dict[str, Any],
+                         chunk_size: int = 1000) -> Iterator[bytes]:
+        """Encode a snapshot piecewise so a long dump never holds the GIL for
+        more than one chunk at a time"""
+        yield _dumps(meta)[:-1] + b',"urls":{'
+        items = list(records.items())
+        for start in range(0, len(items), chunk_size):
+            chunk = {code: record.to_dict() for code, record in items[start:start + chunk_size]}
+            chunk = _dumps(chunk)[1:-1]
+            yield chunk if start == 0 else b"," + chunk
+        yield b"}}"
+
+    @staticmethod
+    def _write_atomic(path: str, chunks) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
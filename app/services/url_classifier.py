@@ -0,0 +1,100 @@
+"""
+Validation and classification of URLs, shared by URLService and the link
+importer's worker processes
+"""
+import re
+from typing import Optional
+from urllib.parse import urlparse
+
+
+def is_valid_url(url: str) -> bool:
+    """Validate if URL is properly formatted"""
+    import validators  # deferred: not needed to serve redirects
+    return validators.url(url) is True
+
+
+def is_valid_alias(alias: str) -> bool:
+    """Check if alias contains only valid characters"""
+    return re.match('^[a-zA-Z0-9_-]+$', alias) is not None
+
+
+def is_supabase_url(url: str) -> bool:
+    """Check if URL is from Supabase storage"""
+    return 'supabase.co/storage/v1/object/public' in url
+
+
+def get_domain(url: str) -> str:
+    """Extract domain from URL"""
+    try:
+        parsed = urlparse(url)
+        return parsed.netloc
+    except:
+        return "unknown"
+
+
+def extract_filename(url: str) -> Optional[str]:
+    """Extract filename from URL for smart alias generation"""
+    try:
+        # Remove trailing characters
+        url = url.rstrip('|').rstrip('/')
+
+        # Get the last part after the last /
+        path = urlparse(url).path
+        filename = path.split('/')[-1]
+
+        if not filename:
+            return None
+
+        # Remove file extension and clean up
+        name_part = filename.split('.')[0]
+
+        # Remove timestamp-like numbers and clean
+        clean_name = re.sub(r'[_-]\d{10,}', '', name_part)
+        clean_name = re.sub(r'[^a-zA-Z0-9_-]', '', clean_name)
+
+        # Replace underscores with hyphens and make lowercase
+        clean_name = clean_name.replace('_', '-').lower()
+
+        return clean_name if clean_name else None
+    except:
+        return None
+
+
+def get_file_type(url: str) -> str:
+    """Extract file type from URL"""
+    try:
+        # Get the path from URL
+        parsed_url = urlparse(url)
+        path = parsed_url.path.lower()
+
+        # Extract extension
+        extension = path.split('.')[-1] if '.' in path else ''
+
+        # Categorize by extension
+        if extension in ['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'bmp', 'ico']:
+            return 'image'
+        elif extension in ['pdf', 'doc', 'docx', 'txt', 'rtf', 'odt']:
+            return 'document'
+        elif extension in ['mp4', 'mov', 'avi', 'mkv', 'webm', 'flv']:
+            return 'video'
+        elif extension in ['mp3', 'wav', 'flac', 'aac', 'ogg']:
+            return 'audio'
+        elif extension in ['zip', 'rar', '7z', 'tar', 'gz']:
+            return 'archive'
+        elif extension in ['exe', 'msi', 'dmg', 'pkg', 'deb', 'rpm']:
+            return 'software'
+        elif extension in ['html', 'htm', 'php', 'asp', 'jsp']:
+            return 'webpage'
+        else:
+            # Check by domain patterns
+            domain = get_domain(url)
+            if any(x in domain for x in ['youtube.com', 'vimeo.com', 'dailymotion.com']):
+                return 'video'
+            elif any(x in domain for x in ['soundcloud.com', 'spotify.com']):
+                return 'audio'
+            elif any(x in domain for x in ['github.com', 'gitlab.com', 'bitbucket.org']):
+                return 'code'
+            else:
+                return 'link'
+    except:
+        return 'link'
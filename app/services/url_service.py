@@ -1,90 +1,247 @@
-import json
-import os
-import random
-import string
-import re
+import asyncio
+import functools
 import hashlib
 import base64
-import io
-from datetime import datetime, timedelta
-from urllib.parse import urlparse
-from typing import Optional, List, Dict, Any
-import validators
-import qrcode
-from qrcode.image.styledpil import StyledPilImage
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Callable, AsyncIterator, Collection
 
 from app.core.config import settings
+from app.models.url_record import URLRecord, to_epoch, to_iso
+from app.services.bloom_filter import BloomFilter
+from app.services.code_allocator import ShortCodeAllocator
+from app.services.dedup_index import DedupIndex
+from app.services.redirect_cache import Redirect, RedirectCache
+from app.services.qr_cache import QRCache, QRDiskCache
+from app.services.qr_pool import QRRenderPool
+from app.services.qr_render import FORMATS as QR_FORMATS, qr_key
+from app.services.redirect_queue import Event, RedirectQueue
+from app.services.click_buffer import ClickBuffer
+from app.services.url_classifier import (
+    extract_filename, get_domain, get_file_type, is_supabase_url, is_valid_alias, is_valid_url
+)
+from app.services.storage import StorageBackend, create_storage
 
 class URLService:
     def __init__(self, storage_file: str = None):
         self.storage_file = storage_file or settings.STORAGE_FILE
         self.base_url = settings.BASE_URL
         self.urls = self.load_urls()
+        self.shared = self.urls.shared
+        self.clicks = ClickBuffer(settings.CLICK_FLUSH_SIZE, settings.CLICK_FLUSH_INTERVAL)
+        self.redirect_cache = RedirectCache(settings.REDIRECT_CACHE_SIZE)
+        self.qr_cache = QRCache(settings.QR_CACHE_BYTES) if settings.QR_CACHE_BYTES > 0 else None
+        self.qr_disk = QRDiskCache(settings.QR_CACHE_DIR) if settings.QR_CACHE_DIR else None
+        self.qr_renderer = QRRenderPool(settings.QR_RENDER_WORKERS, settings.QR_RENDER_TIMEOUT)
+        self.redirect_events = self._build_queue()
+        self.codes = ShortCodeAllocator(f"{self.storage_file}.seq", settings.SHORT_CODE_LENGTH,
+                                        settings.SHORT_CODE_BLOCK)
+        self.known_codes = self._build_filter()
+        self.dedup = DedupIndex(self.urls.values()) if settings.DEDUP_URLS else None
+        # Storage writes run here, one at a time and in order, off the event loop
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="url-store-io")
+        self._click_flush: Optional[Future] = None
+        self._synced_at = 0.0
     
-    def load_urls(self) -> Dict[str, Any]:
-        """Load URLs from storage file"""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading URLs: {e}")
-                return {}
-        return {}
+    def load_urls(self) -> StorageBackend:
+        """Open the configured storage backend"""
+        return create_storage(self.storage_file)
     
     def save_urls(self) -> None:
-        """Save URLs to storage file"""
+        """Write a full snapshot of all URLs and reset the mutation log"""
         try:
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(self.urls, f, indent=2, ensure_ascii=False)
+            self.urls.save()
         except Exception as e:
             print(f"Error saving URLs: {e}")
     
+    def sync(self) -> Optional[List[str]]:
+        """Pick up links other worker processes changed in the shared store"""
+        self._synced_at = time.monotonic()
+        changed = self.urls.refresh()
+        if changed is None:
+            self.redirect_cache.clear()
+            self.rebuild_filter()
+            if self.dedup is not None:
+                self.dedup = DedupIndex(self.urls.values())
+        else:
+            for short_code in changed:
+                self.redirect_cache.invalidate(short_code)
+                record = self.urls.get(short_code)
+                if record is None:
+                    self._forget_qr(short_code)
+                    continue
+                if self.known_codes is not None:
+                    self.known_codes.add(short_code)
+                if self.dedup is not None:
+                    self.dedup.add(record)
+        return changed
+    
+    def _build_filter(self) -> Optional[BloomFilter]:
+        """Bloom filter over the stored short codes, unless disabled"""
+        if settings.BLOOM_FP_RATE <= 0:
+            return None
+        return BloomFilter(settings.BLOOM_FP_RATE, self.urls, capacity=max(1024, len(self.urls) * 2))
+    
+    def _build_queue(self) -> Optional[RedirectQueue]:
+        """Post-redirect event queue, unless disabled"""
+        if settings.REDIRECT_QUEUE_SIZE <= 0:
+            return None
+        return RedirectQueue(settings.REDIRECT_QUEUE_SIZE, settings.REDIRECT_QUEUE_POLICY,
+                             settings.REDIRECT_QUEUE_BATCH)
+    
+    def rebuild_filter(self) -> None:
+        """Refill the Bloom filter, dropping deleted codes"""
+        if self.known_codes is not None:
+            self.known_codes.rebuild(lambda: list(self.urls), len(self.urls))
+    
+    def _may_exist(self, short_code: str) -> bool:
+        """False when the short code is certainly not stored"""
+        if self.known_codes is None or short_code in self.known_codes:
+            return True
+        # The link may have just been created by another worker
+        return self._sync_for_miss(short_code)
+    
+    def _sync_for_miss(self, short_code: str) -> bool:
+        """Sync a shared store after a short code was not found, unless a sync
+        ran within SHARED_MISS_SYNC_INTERVAL; whether the code may have
+        arrived. Scanners cannot turn every unknown code into a log read."""
+        if not self.shared or time.monotonic() - self._synced_at < settings.SHARED_MISS_SYNC_INTERVAL:
+            return False
+        changed = self.sync()
+        return changed is None or short_code in changed
+    
+    def flush_clicks(self) -> None:
+        """Persist buffered click counts in one batch"""
+        pending = self.clicks.drain()
+        if pending:
+            self.urls.add_clicks(pending)
+    
+    def record_click(self, short_code: str, accessed_at: int) -> None:
+        """Count a redirect: queued for the background consumer while it
+        runs (dropped if the queue is full), buffered inline otherwise"""
+        events = self.redirect_events
+        if events is not None and events.running:
+            events.offer(short_code, accessed_at)
+        elif self.clicks.record(short_code, accessed_at):
+            self._schedule_click_flush()
+    
+    async def record_click_async(self, short_code: str, accessed_at: int = None) -> None:
+        """Like ``record_click`` but waits for queue space under the
+        ``block`` policy"""
+        if accessed_at is None:
+            accessed_at = int(time.time())
+        events = self.redirect_events
+        if events is not None and events.running:
+            await events.put(short_code, accessed_at)
+        else:
+            self.record_click(short_code, accessed_at)
+    
+    def apply_redirect_events(self, batch: List[Event]) -> None:
+        """Buffer the clicks of a batch of queued redirects"""
+        due = False
+        for short_code, accessed_at, _ in batch:
+            due = self.clicks.record(short_code, accessed_at)
+        if due:
+            self._schedule_click_flush()
+    
+    def _schedule_click_flush(self) -> None:
+        """Queue a due click flush on the I/O thread unless one is already queued"""
+        if self._click_flush is None or self._click_flush.done():
+            self._click_flush = self.io.submit(self._flush_clicks_logged)
+    
+    def _flush_clicks_logged(self) -> None:
+        try:
+            self.flush_clicks()
+        except Exception as e:
+            print(f"Error flushing clicks: {e}")
+    
+    def wait_for_io(self) -> None:
+        """Block until storage work already queued on the I/O thread is done"""
+        self.io.submit(int).result()
+    
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        """Await a blocking storage call on the I/O thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io, functools.partial(func, *args, **kwargs))
+    
+    async def shorten_url_async(self, *args, **kwargs) -> Dict[str, Any]:
+        """``shorten_url`` without blocking the event loop: the link is stored
+        on the I/O thread, then its QR code is rendered without holding it up"""
+        result = await self.run_io(self.shorten_url, *args, with_qr=False, **kwargs)
+        if "error" not in result:
+            result["qr_code"] = await self.qr_code_for_async(result["short_code"])
+        return result
+    
+    async def delete_url_async(self, short_code: str) -> Dict[str, Any]:
+        """``delete_url`` without blocking the event loop"""
+        return await self.run_io(self.delete_url, short_code)
+    
+    async def flush_clicks_async(self) -> None:
+        """``flush_clicks`` without blocking the event loop"""
+        await self.run_io(self.flush_clicks)
+    
+    async def purge_expired_async(self) -> int:
+        """``purge_expired`` without blocking the event loop"""
+        return await self.run_io(self.purge_expired)
+    
+    async def rebuild_filter_async(self) -> None:
+        """``rebuild_filter`` on the I/O thread, ordered with writes"""
+        await self.run_io(self.rebuild_filter)
+    
+    async def sync_async(self) -> Optional[List[str]]:
+        """``sync`` without blocking the event loop"""
+        return await self.run_io(self.sync)
+    
+    def _click_count(self, record: URLRecord) -> Tuple[int, Optional[str]]:
+        """Stored clicks and last access merged with any buffered or queued ones"""
+        clicks = record.clicks
+        last_accessed = record.last_accessed
+        pending = self.clicks.get(record.short_code)
+        if pending:
+            clicks += pending[0]
+            last_accessed = pending[1]
+        queued = self.redirect_events.pending(record.short_code) if self.redirect_events is not None else None
+        if queued:
+            clicks += queued[0]
+            last_accessed = max(last_accessed or 0, queued[1])
+        return clicks, to_iso(last_accessed)
+    
+    def storage_stats(self) -> Dict[str, Any]:
+        """Get storage engine metrics"""
+        return self.urls.stats()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get cache metrics"""
+        return {
+            "redirect_cache": self.redirect_cache.stats(),
+            "redirect_queue": self.redirect_events.stats() if self.redirect_events is not None else None,
+            "qr_cache": self.qr_cache.stats() if self.qr_cache is not None else None,
+            "qr_disk_cache": self.qr_disk.stats() if self.qr_disk is not None else None,
+            "qr_render_pool": self.qr_renderer.stats(),
+            "bloom_filter": self.known_codes.stats() if self.known_codes is not None else None
+        }
+    
     def is_valid_url(self, url: str) -> bool:
         """Validate if URL is properly formatted"""
-        return validators.url(url) is True
+        return is_valid_url(url)
     
     def is_supabase_url(self, url: str) -> bool:
         """Check if URL is from Supabase storage"""
-        return 'supabase.co/storage/v1/object/public' in url
+        return is_supabase_url(url)
     
     def get_domain(self, url: str) -> str:
         """Extract domain from URL"""
-        try:
-            parsed = urlparse(url)
-            return parsed.netloc
-        except:
-            return "unknown"
+        return get_domain(url)
     
     def extract_filename(self, url: str) -> Optional[str]:
         """Extract filename from URL for smart alias generation"""
-        try:
-            # Remove trailing characters
-            url = url.rstrip('|').rstrip('/')
-            
-            # Get the last part after the last /
-            path = urlparse(url).path
-            filename = path.split('/')[-1]
-            
-            if not filename:
-                return None
-            
-            # Remove file extension and clean up
-            name_part = filename.split('.')[0]
-            
-            # Remove timestamp-like numbers and clean
-            clean_name = re.sub(r'[_-]\d{10,}', '', name_part)
-            clean_name = re.sub(r'[^a-zA-Z0-9_-]', '', clean_name)
-            
-            # Replace underscores with hyphens and make lowercase
-            clean_name = clean_name.replace('_', '-').lower()
-            
-            return clean_name if clean_name else None
-        except:
-            return None
+        return extract_filename(url)
     
-    def generate_smart_alias(self, url: str) -> str:
-        """Generate a smart alias based on the URL"""
+    def generate_smart_alias(self, url: str, taken: Callable[[str], bool] = None) -> str:
+        """Generate a smart alias based on the URL that ``taken`` (by
+        default: already stored) does not reject"""
+        taken = taken or self.urls.__contains__
         # Try to extract filename first
         base_alias = self.extract_filename(url)
         
@@ -94,32 +251,26 @@ class URLService:
             if domain and domain != "unknown":
                 base_alias = domain.replace('.', '-').replace('www-', '')
             else:
-                return self.generate_short_code()
+                return self.generate_short_code(taken)
         
         # Ensure alias is reasonable length
         if len(base_alias) > 20:
             base_alias = base_alias[:20]
         
         # If the base alias is available, use it
-        if base_alias not in self.urls:
+        if not taken(base_alias):
             return base_alias
         
-        # If taken, add a number
-        counter = 1
-        while f"{base_alias}-{counter}" in self.urls:
-            counter += 1
-        
-        return f"{base_alias}-{counter}"
+        # If taken, add the next free number for this base
+        return self.codes.next_suffixed(base_alias, taken)
     
-    def generate_short_code(self, length: int = None) -> str:
-        """Generate a random short code"""
-        length = length or settings.SHORT_CODE_LENGTH
-        chars = string.ascii_letters + string.digits
-        return ''.join(random.choice(chars) for _ in range(length))
+    def generate_short_code(self, taken: Callable[[str], bool] = None) -> str:
+        """Allocate an unused random-looking short code"""
+        return self.codes.next_code(taken or self.urls.__contains__)
     
     def is_valid_alias(self, alias: str) -> bool:
         """Check if alias contains only valid characters"""
-        return re.match('^[a-zA-Z0-9_-]+$', alias) is not None
+        return is_valid_alias(alias)
     
     def hash_password(self, password: str) -> str:
         """Hash password for storage"""
@@ -131,42 +282,91 @@ class URLService:
     
     def get_file_type(self, url: str) -> str:
         """Extract file type from URL"""
-        try:
-            # Get the path from URL
-            parsed_url = urlparse(url)
-            path = parsed_url.path.lower()
-            
-            # Extract extension
-            extension = path.split('.')[-1] if '.' in path else ''
-            
-            # Categorize by extension
-            if extension in ['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'bmp', 'ico']:
-                return 'image'
-            elif extension in ['pdf', 'doc', 'docx', 'txt', 'rtf', 'odt']:
-                return 'document'
-            elif extension in ['mp4', 'mov', 'avi', 'mkv', 'webm', 'flv']:
-                return 'video'
-            elif extension in ['mp3', 'wav', 'flac', 'aac', 'ogg']:
-                return 'audio'
-            elif extension in ['zip', 'rar', '7z', 'tar', 'gz']:
-                return 'archive'
-            elif extension in ['exe', 'msi', 'dmg', 'pkg', 'deb', 'rpm']:
-                return 'software'
-            elif extension in ['html', 'htm', 'php', 'asp', 'jsp']:
-                return 'webpage'
+        return get_file_type(url)
+    
+    def qr_image(self, url: str, fmt: str = "png", box_size: int = 10, border: int = 4) -> bytes:
+        """QR code for URL as PNG or SVG bytes, from the memory or disk
+        cache when possible, otherwise rendered by the QR render pool"""
+        image = self._cached_qr(url, fmt, box_size, border)
+        if image is None:
+            started = time.perf_counter()
+            image = self.qr_renderer.render(url, fmt, box_size, border)
+            self._cache_qr(url, fmt, box_size, border, image, time.perf_counter() - started)
+        return image
+    
+    async def qr_image_async(self, url: str, fmt: str = "png", box_size: int = 10,
+                             border: int = 4) -> bytes:
+        """``qr_image`` that never blocks the event loop: only the memory cache
+        is read on it, disk cache files are read and written on a thread"""
+        image = self._memory_qr(url, fmt, box_size, border)
+        if image is None and self.qr_disk is not None:
+            image = await asyncio.to_thread(self._disk_qr, url, fmt, box_size, border)
+        if image is None:
+            started = time.perf_counter()
+            image = await self.qr_renderer.render_async(url, fmt, box_size, border)
+            render_seconds = time.perf_counter() - started
+            if self.qr_disk is not None:
+                await asyncio.to_thread(self._cache_qr, url, fmt, box_size, border, image,
+                                        render_seconds)
             else:
-                # Check by domain patterns
-                domain = self.get_domain(url)
-                if any(x in domain for x in ['youtube.com', 'vimeo.com', 'dailymotion.com']):
-                    return 'video'
-                elif any(x in domain for x in ['soundcloud.com', 'spotify.com']):
-                    return 'audio'
-                elif any(x in domain for x in ['github.com', 'gitlab.com', 'bitbucket.org']):
-                    return 'code'
-                else:
-                    return 'link'
-        except:
-            return 'link'
+                self._cache_qr(url, fmt, box_size, border, image, render_seconds)
+        return image
+    
+    def qr_images(self, urls: List[str], fmt: str = "png", box_size: int = 10,
+                  border: int = 4) -> List[bytes]:
+        """``qr_image`` for many URLs, rendering the misses in parallel"""
+        images = {url: self._cached_qr(url, fmt, box_size, border) for url in urls}
+        missing = [url for url, image in images.items() if image is None]
+        started = time.perf_counter()
+        rendered = self.qr_renderer.render_many((url, fmt, box_size, border) for url in missing)
+        for url, image in zip(missing, rendered):
+            images[url] = image
+            # Renders overlap, so each one is charged the time since the last
+            self._cache_qr(url, fmt, box_size, border, image, time.perf_counter() - started)
+            started = time.perf_counter()
+        return [images[url] for url in urls]
+    
+    def _cached_qr(self, url: str, fmt: str, box_size: int, border: int) -> Optional[bytes]:
+        image = self._memory_qr(url, fmt, box_size, border)
+        if image is None:
+            image = self._disk_qr(url, fmt, box_size, border)
+        return image
+    
+    def _memory_qr(self, url: str, fmt: str, box_size: int, border: int) -> Optional[bytes]:
+        if self.qr_cache is None:
+            return None
+        return self.qr_cache.get(url, (fmt, box_size, border))
+    
+    def _disk_qr(self, url: str, fmt: str, box_size: int, border: int) -> Optional[bytes]:
+        """Read a QR code from the disk cache, keeping it in memory too;
+        no render time is recorded for it"""
+        if self.qr_disk is None:
+            return None
+        image = self.qr_disk.get(qr_key(url, fmt, box_size, border), fmt)
+        if image is not None and self.qr_cache is not None:
+            self.qr_cache.put(url, (fmt, box_size, border), image)
+        return image
+    
+    def _cache_qr(self, url: str, fmt: str, box_size: int, border: int, image: bytes,
+                  render_seconds: float) -> None:
+        if self.qr_disk is not None:
+            self.qr_disk.put(qr_key(url, fmt, box_size, border), fmt, image)
+        if self.qr_cache is not None:
+            self.qr_cache.put(url, (fmt, box_size, border), image, render_seconds)
+    
+    def qr_url(self, short_code: str, fmt: str = "png") -> str:
+        """URL of the QR code image endpoint for a link"""
+        url = f"{self.base_url}/api/qr/{short_code}"
+        return url if fmt == "png" else f"{url}?format={fmt}"
+    
+    def _forget_qr(self, short_code: str) -> None:
+        """Evict cached QR codes of a deleted link"""
+        short_url = f"{self.base_url}/{short_code}"
+        if self.qr_cache is not None:
+            self.qr_cache.invalidate(short_url)
+        if self.qr_disk is not None:
+            for fmt in QR_FORMATS:
+                self.qr_disk.discard(qr_key(short_url, fmt), fmt)
     
     def generate_qr_code(self, url: str) -> str:
         """Generate QR code for URL and return as base64 string"""
@@ -174,31 +374,61 @@ class URLService:
             return None
         
         try:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(url)
-            qr.make(fit=True)
-            
-            # Create QR code image
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-            
-            return f"data:image/png;base64,{img_str}"
+            return self._qr_data_uri(self.qr_image(url))
         except Exception as e:
             print(f"Error generating QR code: {e}")
             return None
     
+    def generate_qr_codes(self, urls: List[str]) -> List[Optional[str]]:
+        """``generate_qr_code`` for many URLs, rendered in parallel"""
+        if not settings.ENABLE_QR_CODES:
+            return [None] * len(urls)
+        
+        try:
+            return [self._qr_data_uri(image) for image in self.qr_images(urls)]
+        except Exception as e:
+            print(f"Error generating QR codes: {e}")
+            return [None] * len(urls)
+    
+    def qr_code_for(self, short_code: str, inline: bool = None) -> Optional[str]:
+        """QR code of a link as a data URI, or as the URL of the QR endpoint
+        unless ``inline`` (default: QR_INLINE) is set"""
+        if not settings.ENABLE_QR_CODES:
+            return None
+        if inline is None:
+            inline = settings.QR_INLINE
+        if not inline:
+            return self.qr_url(short_code)
+        return self.generate_qr_code(f"{self.base_url}/{short_code}")
+    
+    async def qr_code_for_async(self, short_code: str, inline: bool = None) -> Optional[str]:
+        """``qr_code_for`` that renders without blocking the event loop"""
+        if not settings.ENABLE_QR_CODES:
+            return None
+        if inline is None:
+            inline = settings.QR_INLINE
+        if not inline:
+            return self.qr_url(short_code)
+        
+        try:
+            return self._qr_data_uri(await self.qr_image_async(f"{self.base_url}/{short_code}"))
+        except Exception as e:
+            print(f"Error generating QR code: {e}")
+            return None
+    
+    @staticmethod
+    def _qr_data_uri(image: bytes) -> str:
+        return f"data:image/png;base64,{base64.b64encode(image).decode()}"
+    
+    def qr_codes_for(self, short_codes: List[str]) -> List[Optional[str]]:
+        """``qr_code_for`` for many links"""
+        if settings.ENABLE_QR_CODES and not settings.QR_INLINE:
+            return [self.qr_url(short_code) for short_code in short_codes]
+        return self.generate_qr_codes([f"{self.base_url}/{short_code}" for short_code in short_codes])
+    
     def shorten_url(self, long_url: str, custom_alias: str = None, 
                    description: str = None, expiry_date: datetime = None, 
-                   password: str = None) -> Dict[str, Any]:
+                   password: str = None, with_qr: bool = True) -> Dict[str, Any]:
         """
         Shorten a URL with enhanced features
         
@@ -208,6 +438,7 @@ class URLService:
             description (str): Optional description for the URL
             expiry_date (datetime): Optional expiry date
             password (str): Optional password protection
+            with_qr (bool): Render the QR code into the result
         
         Returns:
             dict: Result containing short URL and details
@@ -216,6 +447,13 @@ class URLService:
         # Clean the URL
         long_url = long_url.strip()
         
+        # Hand out the existing link when the same URL is shortened again
+        if self.dedup is not None and not (custom_alias or password or expiry_date):
+            existing = self._find_duplicate(long_url)
+            if existing is not None:
+                qr_code = self.qr_code_for(existing.short_code) if with_qr else None
+                return self._shorten_result(existing, qr_code)
+        
         # Validate URL
         if not self.is_valid_url(long_url):
             return {"error": "Please provide a valid URL"}
@@ -235,69 +473,205 @@ class URLService:
             short_code = self.generate_smart_alias(long_url)
         
         # Create URL record
-        url_record = {
-            "long_url": long_url,
-            "short_code": short_code,
-            "created_at": datetime.now().isoformat(),
-            "description": description or self.extract_filename(long_url) or "Link",
-            "clicks": 0,
-            "is_supabase": self.is_supabase_url(long_url),
-            "file_type": self.get_file_type(long_url),
-            "domain": self.get_domain(long_url),
-            "expiry_date": expiry_date.isoformat() if expiry_date else None,
-            "password_hash": self.hash_password(password) if password else None,
-            "last_accessed": None
-        }
+        url_record = self._new_record(short_code, long_url, int(time.time()),
+                                      description, expiry_date, password)
         
         # Debug: Print URL record being stored
         print(f"🗃️ Storing URL record:")
         print(f"  - password provided: '{password}' (type: {type(password)})")
-        print(f"  - password_hash created: {url_record['password_hash']}")
+        print(f"  - password_hash created: {url_record.password_hash}")
         
-        # Store the URL
-        self.urls[short_code] = url_record
-        self.save_urls()
+        # Store the URL, unless another worker took the code since we synced
+        moved, rejected = self._store_many({short_code: url_record},
+                                           fixed=[short_code] if custom_alias else ())
+        if rejected:
+            return {"error": f"Custom alias '{custom_alias}' is already taken"}
+        url_record = moved.get(short_code, url_record)
         
-        short_url = f"{self.base_url}/{short_code}"
-        qr_code = self.generate_qr_code(short_url)
+        return self._shorten_result(url_record, self.qr_code_for(url_record.short_code) if with_qr else None)
+    
+    def bulk_shorten(self, long_urls: List[str], with_qr: bool = False) -> List[Dict[str, Any]]:
+        """Shorten a batch of URLs with smart aliases, storing all new links
+        in one write. Results come back in input order; QR codes are only
+        rendered when ``with_qr`` is set."""
+        now = int(time.time())
+        created: Dict[str, URLRecord] = {}
+        created_for: Dict[bytes, URLRecord] = {}
+        taken = lambda code: code in created or code in self.urls
+        records: List[Optional[URLRecord]] = []
+        
+        # Validate, classify and allocate codes for the whole batch
+        for long_url in long_urls:
+            long_url = long_url.strip()
+            if self.dedup is not None:
+                key = self.dedup.key(long_url)
+                existing = created_for.get(key) or self._find_duplicate(long_url)
+                if existing is not None:
+                    records.append(existing)
+                    continue
+            if not self.is_valid_url(long_url):
+                records.append(None)
+                continue
+            url_record = self._new_record(self.generate_smart_alias(long_url, taken), long_url, now)
+            created[url_record.short_code] = url_record
+            if self.dedup is not None:
+                created_for[key] = url_record
+            records.append(url_record)
+        
+        # Commit once
+        moved, _ = self._store_many(created)
+        records = [moved.get(url_record.short_code, url_record) if url_record is not None else None
+                   for url_record in records]
+        
+        stored = [url_record for url_record in records if url_record is not None]
+        qr_codes = iter(self.qr_codes_for([r.short_code for r in stored]) if with_qr
+                        else [None] * len(stored))
+        return [self._shorten_result(url_record, next(qr_codes)) if url_record is not None
+                else {"error": "Please provide a valid URL"} for url_record in records]
+    
+    def import_links(self, rows: List[Tuple[int, Dict[str, Any], None]]) -> List[Tuple[int, str]]:
+        """Store rows prepared by ``link_import.prepare_rows`` in one write,
+        keeping their short codes or allocating smart aliases; returns
+        (row number, error) for the rows that were rejected"""
+        created: Dict[str, URLRecord] = {}
+        taken = lambda code: code in created or code in self.urls
+        given: Dict[str, int] = {}
+        errors = []
+        for number, fields, _ in rows:
+            fields = dict(fields)
+            short_code = fields.pop("short_code")
+            if short_code is None:
+                short_code = self.generate_smart_alias(fields["long_url"], taken)
+            elif taken(short_code):
+                errors.append((number, f"Short code '{short_code}' is already taken"))
+                continue
+            else:
+                given[short_code] = number
+            created[short_code] = URLRecord(short_code=short_code, **fields)
+        _, rejected = self._store_many(created, fixed=given)
+        errors.extend((given[code], f"Short code '{code}' is already taken") for code in rejected)
+        return errors
+    
+    def _store_many(self, records: Dict[str, URLRecord],
+                    fixed: Collection[str] = ()) -> Tuple[Dict[str, URLRecord], List[str]]:
+        """Write new links with one storage call and index them.
+        
+        Another worker may have stored one of the codes since this one last
+        synced. Its link is kept; ours gets a fresh smart alias, or is
+        rejected when its code is in ``fixed``. Returns the links that moved,
+        keyed by their original code, and the rejected codes.
+        """
+        moved: Dict[str, URLRecord] = {}
+        rejected: List[str] = []
+        original = {code: code for code in records}
+        while records:
+            taken = set(self.urls.insert_many(records))
+            retry: Dict[str, URLRecord] = {}
+            for code, url_record in records.items():
+                if code not in taken:
+                    if self.known_codes is not None:
+                        self.known_codes.add(code)
+                    if self.dedup is not None:
+                        self.dedup.add(url_record)
+                elif code in fixed:
+                    rejected.append(code)
+                else:
+                    new_code = self.generate_smart_alias(
+                        url_record.long_url, lambda c: c in retry or c in self.urls)
+                    retry[new_code] = moved[original[code]] = url_record.replace(short_code=new_code)
+                    original[new_code] = original[code]
+            records = retry
+        return moved, rejected
+    
+    async def bulk_shorten_async(self, long_urls: List[str],
+                                 with_qr: bool = False) -> AsyncIterator[List[Dict[str, Any]]]:
+        """``bulk_shorten`` on the I/O thread in chunks of BULK_COMMIT_SIZE
+        URLs, yielding each chunk's results once it is stored. QR codes are
+        rendered after the chunk is stored, off the I/O thread."""
+        size = max(1, settings.BULK_COMMIT_SIZE)
+        for start in range(0, len(long_urls), size):
+            results = await self.run_io(self.bulk_shorten, long_urls[start:start + size])
+            if with_qr:
+                stored = [result for result in results if "error" not in result]
+                qr_codes = await asyncio.to_thread(
+                    self.qr_codes_for, [result["short_code"] for result in stored])
+                for result, qr_code in zip(stored, qr_codes):
+                    result["qr_code"] = qr_code
+            yield results
+    
+    def _new_record(self, short_code: str, long_url: str, created_at: int,
+                    description: str = None, expiry_date: datetime = None,
+                    password: str = None) -> URLRecord:
+        """Classify a validated URL into a new record"""
+        url_record = URLRecord(
+            short_code=short_code,
+            long_url=long_url,
+            created_at=created_at,
+            description=description or self.extract_filename(long_url) or "Link",
+            is_supabase=self.is_supabase_url(long_url),
+            file_type=self.get_file_type(long_url),
+            domain=self.get_domain(long_url),
+            password_hash=self.hash_password(password) if password else None
+        )
+        if expiry_date:
+            url_record.expires_at = to_epoch(expiry_date)
+        return url_record
+    
+    def _shorten_result(self, url_record: URLRecord, qr_code: Optional[str] = None) -> Dict[str, Any]:
+        """Response for a created (or deduplicated) link"""
+        short_url = f"{self.base_url}/{url_record.short_code}"
         
         return {
             "success": True,
             "short_url": short_url,
-            "short_code": short_code,
-            "long_url": long_url,
-            "created_at": url_record["created_at"],
-            "description": url_record["description"],
-            "file_type": url_record["file_type"],
-            "domain": url_record["domain"],
+            "short_code": url_record.short_code,
+            "long_url": url_record.long_url,
+            "created_at": to_iso(url_record.created_at),
+            "description": url_record.description,
+            "file_type": url_record.file_type,
+            "domain": url_record.domain,
             "qr_code": qr_code
         }
     
+    def _find_duplicate(self, long_url: str) -> Optional[URLRecord]:
+        """Existing link without password or expiry for the same URL"""
+        short_code = self.dedup.get(long_url)
+        if short_code is None:
+            return None
+        url_record = self.urls.get(short_code)
+        if url_record is not None and self.dedup.matches(url_record, long_url):
+            return url_record
+        # Deleted or replaced since it was indexed
+        self.dedup.discard(long_url, short_code)
+        return None
+    
     def get_url_info(self, short_code: str) -> Dict[str, Any]:
         """Get information about a shortened URL"""
-        if short_code not in self.urls:
+        url_record = self.urls.get(short_code)
+        if url_record is None and self._sync_for_miss(short_code):
+            # The link was just created by another worker
+            url_record = self.urls.get(short_code)
+        if url_record is None:
             return {"error": "Short URL not found"}
         
-        url_record = self.urls[short_code]
-        
         # Check if URL has expired
-        if url_record.get("expiry_date"):
-            expiry = datetime.fromisoformat(url_record["expiry_date"])
-            if datetime.now() > expiry:
-                return {"error": "Short URL has expired"}
+        if time.time() > url_record.expires_at:
+            return {"error": "Short URL has expired"}
+        
+        clicks, last_accessed = self._click_count(url_record)
         
         return {
             "success": True,
-            "long_url": url_record["long_url"],
+            "long_url": url_record.long_url,
             "short_code": short_code,
-            "created_at": url_record["created_at"],
-            "description": url_record.get("description"),
-            "clicks": url_record.get("clicks", 0),
-            "file_type": url_record.get("file_type", "link"),
-            "domain": url_record.get("domain", "unknown"),
-            "expiry_date": url_record.get("expiry_date"),
-            "has_password": bool(url_record.get("password_hash")),
-            "last_accessed": url_record.get("last_accessed")
+            "created_at": to_iso(url_record.created_at),
+            "description": url_record.description,
+            "clicks": clicks,
+            "file_type": url_record.file_type,
+            "domain": url_record.domain,
+            "expiry_date": url_record.expiry_date,
+            "has_password": url_record.has_password,
+            "last_accessed": last_accessed
         }
     
     def expand_url(self, short_code: str, password: str = None) -> Dict[str, Any]:
@@ -308,17 +682,15 @@ class URLService:
             return url_info
         
         # Check password if required
-        if self.urls[short_code].get("password_hash"):
+        password_hash = self.urls[short_code].password_hash
+        if password_hash:
             if not password:
                 return {"error": "Password required"}
             
-            if not self.verify_password(password, self.urls[short_code]["password_hash"]):
+            if not self.verify_password(password, password_hash):
                 return {"error": "Invalid password"}
         
-        # Increment click counter and update last accessed
-        self.urls[short_code]["clicks"] += 1
-        self.urls[short_code]["last_accessed"] = datetime.now().isoformat()
-        self.save_urls()
+        self.record_click(short_code, int(time.time()))
         
         return {
             "success": True,
@@ -326,46 +698,135 @@ class URLService:
             "file_type": url_info["file_type"]
         }
     
+    def lookup_redirect(self, short_code: str, password: str = None, use_cache: bool = True,
+                        count_click: bool = True) -> Tuple[Optional[Redirect], Optional[str]]:
+        """Redirect fast path: one lookup, expiry and password checks and a
+        buffered click. Returns (redirect, error); the redirect carries its
+        pre-encoded 302 headers and is served from the redirect cache when
+        possible. Callers passing ``count_click=False`` record the click
+        themselves."""
+        now = time.time()
+        redirect = self.redirect_cache.get(short_code, now) if use_cache else None
+        if redirect is None:
+            if not self._may_exist(short_code):
+                return None, "Short URL not found"
+            # A delete on the I/O thread may land between this read and put()
+            generation = self.redirect_cache.generation
+            url_record = self.urls.get(short_code)
+            if url_record is None and self._sync_for_miss(short_code):
+                url_record = self.urls.get(short_code)
+            if url_record is None:
+                if self.known_codes is not None:
+                    self.known_codes.record_false_positive()
+                return None, "Short URL not found"
+            
+            if now > url_record.expires_at:
+                return None, "Short URL has expired"
+            
+            if url_record.password_hash is not None:
+                if not password:
+                    return None, "Password required"
+                if not self.verify_password(password, url_record.password_hash):
+                    return None, "Invalid password"
+                # Password-protected links are never cached
+                redirect = Redirect(url_record.long_url, url_record.expires_at)
+            else:
+                redirect = self.redirect_cache.put(short_code, url_record.long_url,
+                                                   url_record.expires_at, generation)
+        
+        if count_click:
+            self.record_click(short_code, int(now))
+        
+        return redirect, None
+    
+    def cached_redirect(self, short_code: str, count_click: bool = True) -> Optional[Redirect]:
+        """Redirect for a link in the redirect cache, recording the click
+        unless ``count_click`` is False; None on a cache miss"""
+        now = time.time()
+        redirect = self.redirect_cache.get(short_code, now)
+        if redirect is not None and count_click:
+            self.record_click(short_code, int(now))
+        return redirect
+    
     def delete_url(self, short_code: str) -> Dict[str, Any]:
         """Delete a shortened URL"""
-        if short_code not in self.urls:
+        url_record = self.urls.get(short_code)
+        try:
+            del self.urls[short_code]
+        except KeyError:
             return {"error": "Short URL not found"}
         
-        del self.urls[short_code]
-        self.save_urls()
+        if self.dedup is not None and url_record is not None:
+            self.dedup.discard(url_record.long_url, short_code)
+        
+        self.clicks.discard(short_code)
+        self.redirect_cache.invalidate(short_code)
+        self._forget_qr(short_code)
+        if self.known_codes is not None:
+            self.known_codes.discard(short_code)
         
         return {"success": True, "message": "URL deleted successfully"}
     
-    def list_urls(self, limit: int = None, offset: int = 0) -> Dict[str, Any]:
-        """List all shortened URLs with pagination"""
-        if not self.urls:
-            return {"urls": [], "total": 0}
+    def purge_expired(self) -> int:
+        """Delete one batch of links that expired more than
+        EXPIRY_RETENTION seconds ago; returns how many were purged"""
+        before = int(time.time()) - settings.EXPIRY_RETENTION
+        codes = self.urls.purge_expired(before, settings.EXPIRY_SWEEP_BATCH)
+        for code in codes:
+            self.clicks.discard(code)
+            self.redirect_cache.invalidate(code)
+            self._forget_qr(code)
+            if self.known_codes is not None:
+                self.known_codes.discard(code)
+        return len(codes)
+    
+    def list_urls(self, limit: int = None, offset: int = 0, cursor: str = None) -> Dict[str, Any]:
+        """List shortened URLs newest first, paged by offset or by the
+        ``next_cursor`` of the previous page"""
+        before = None
+        if cursor:
+            before = self.decode_cursor(cursor)
+            if before is None:
+                return {"error": "Invalid cursor"}
+        
+        # Fetch one extra row to know whether another page follows
+        records = self.urls.newest(limit + 1 if limit else None, offset, before)
+        next_cursor = None
+        if limit and len(records) > limit:
+            records = records[:limit]
+            next_cursor = self.encode_cursor(records[-1])
         
         url_list = []
-        for short_code, record in self.urls.items():
+        for record in records:
+            clicks, last_accessed = self._click_count(record)
             url_list.append({
-                "short_url": f"{self.base_url}/{short_code}",
-                "short_code": short_code,
-                "long_url": record["long_url"],
-                "created_at": record["created_at"],
-                "clicks": record.get("clicks", 0),
-                "description": record.get("description", ""),
-                "file_type": record.get("file_type", "link"),
-                "domain": record.get("domain", "unknown"),
-                "has_password": bool(record.get("password_hash")),
-                "expiry_date": record.get("expiry_date"),
-                "last_accessed": record.get("last_accessed")
+                "short_url": f"{self.base_url}/{record.short_code}",
+                "short_code": record.short_code,
+                "long_url": record.long_url,
+                "created_at": to_iso(record.created_at),
+                "clicks": clicks,
+                "description": record.description,
+                "file_type": record.file_type,
+                "domain": record.domain,
+                "has_password": record.has_password,
+                "expiry_date": record.expiry_date,
+                "last_accessed": last_accessed
             })
         
-        # Sort by creation date (newest first)
-        url_list.sort(key=lambda x: x["created_at"], reverse=True)
-        
-        # Apply pagination
-        total = len(url_list)
-        if limit:
-            url_list = url_list[offset:offset + limit]
-        
-        return {"urls": url_list, "total": total}
+        return {"urls": url_list, "total": len(self.urls), "next_cursor": next_cursor}
+    
+    @staticmethod
+    def encode_cursor(record: URLRecord) -> str:
+        """Opaque keyset cursor pointing just after a record"""
+        return f"{record.created_at}.{record.short_code}"
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Optional[Tuple[int, str]]:
+        """(created_at, short_code) key of a cursor, or None if malformed"""
+        created_at, _, short_code = cursor.partition(".")
+        if not created_at.isdigit() or not short_code:
+            return None
+        return int(created_at), short_code
     
     def get_recent_urls(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recently created URLs"""
@@ -374,33 +835,18 @@ class URLService:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get usage statistics"""
-        total_urls = len(self.urls)
-        total_clicks = sum(record.get("clicks", 0) for record in self.urls.values())
-        
-        # Count recent URLs (last 7 days)
-        recent_count = 0
-        week_ago = datetime.now() - timedelta(days=7)
-        
-        active_count = 0
-        for record in self.urls.values():
-            created_at = datetime.fromisoformat(record["created_at"])
-            if created_at > week_ago:
-                recent_count += 1
-            
-            # Check if URL is active (not expired)
-            if record.get("expiry_date"):
-                expiry = datetime.fromisoformat(record["expiry_date"])
-                if datetime.now() <= expiry:
-                    active_count += 1
-            else:
-                active_count += 1
-        
-        return {
-            "total_urls": total_urls,
-            "total_clicks": total_clicks,
-            "recent_urls": recent_count,
-            "active_urls": active_count
-        }
+        # Recent means created in the last 7 days; active means not expired
+        now = time.time()
+        stats = self.urls.summarize(now)
+        if settings.STATS_DEBUG:
+            recount = self.urls.recount(now)
+            if recount != stats:
+                print(f"⚠️ Stats aggregates drifted: {stats} != recount {recount}")
+                stats = recount
+        stats["total_clicks"] += self.clicks.pending_clicks
+        if self.redirect_events is not None:
+            stats["total_clicks"] += self.redirect_events.depth
+        return stats
     
     def generate_html_code(self, short_code: str) -> Dict[str, Any]:
         """Generate HTML code snippet for easy web integration"""
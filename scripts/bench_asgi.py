@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Redirect throughput benchmark for FastRedirectMiddleware.
+
+Drives the ASGI app in-process (no sockets, so only framework cost is
+measured) with GET /<code> requests for a set of hot links, with and
+without the middleware, and reports requests per second.
+
+Usage: python scripts/bench_asgi.py [--links 100] [--requests 50000]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def drive(app, codes):
+    """Send one GET per code straight into the ASGI app"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 302:
+            raise RuntimeError(f"Unexpected status {message['status']}")
+
+    started = time.perf_counter()
+    for code in codes:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": f"/{code}",
+            "raw_path": f"/{code}".encode(), "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 8000)
+        }
+        await app(scope, receive, send)
+    return len(codes) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--links", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["STORAGE_FILE"] = os.path.join(tmp, "urls.json")
+        os.environ["FAST_REDIRECTS"] = "false"
+        from main import app
+        from app.core.dependencies import get_url_service
+        from app.core.middleware import FastRedirectMiddleware
+        url_service = get_url_service()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            links = [url_service.shorten_url(f"https://www.example.com/files/{i}.pdf")["short_code"]
+                     for i in range(args.links)]
+        codes = [random.choice(links) for _ in range(args.requests)]
+        fast_app = FastRedirectMiddleware(
+            app, url_service, {route.path.strip("/").split("/")[0] for route in app.routes}
+        )
+
+        print(f"{args.requests:,} cached redirects over {args.links:,} links")
+        for name, asgi_app in (("FastAPI routing", app), ("FastRedirectMiddleware", fast_app)):
+            asyncio.run(drive(asgi_app, codes[:1000]))
+            print(f"{name:>22}: {asyncio.run(drive(asgi_app, codes)):9,.0f} req/s")
+        url_service.flush_clicks()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Redirect latency under write load.
+
+Runs a redirect every millisecond on the event loop while another task keeps
+creating links, once calling shorten_url directly on the loop and once
+through shorten_url_async (storage I/O thread), and reports p50/p99/max
+redirect latency measured from when each redirect was due.
+
+Usage: python scripts/bench_loop_latency.py [--links 1000] [--seconds 3]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def redirects(service, codes, stop):
+    """One redirect per millisecond; latency counts time spent waiting for the loop"""
+    latencies = []
+    due = time.perf_counter()
+    while not stop.is_set():
+        due += 0.001
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        service.lookup_redirect(random.choice(codes))
+        latencies.append(time.perf_counter() - due)
+        due = max(due, time.perf_counter() - 0.001)
+    return latencies
+
+
+async def writes(service, mode, stop):
+    i = 0
+    while not stop.is_set():
+        url = f"https://www.example.com/uploads/{mode}-{i}.pdf"
+        if mode == "sync":
+            service.shorten_url(url)
+            await asyncio.sleep(0)
+        elif mode == "async":
+            await service.shorten_url_async(url)
+        else:
+            await asyncio.sleep(0.01)
+        i += 1
+
+
+async def measure(service, codes, mode, seconds):
+    stop = asyncio.Event()
+    redirect_task = asyncio.create_task(redirects(service, codes, stop))
+    write_task = asyncio.create_task(writes(service, mode, stop))
+    await asyncio.sleep(seconds)
+    stop.set()
+    latencies = await redirect_task
+    await write_task
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--links", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["STORAGE_FILE"] = os.path.join(tmp, "urls.json")
+        from app.services.url_service import URLService
+
+        service = URLService()
+        # shorten_url prints debug output for every link
+        with contextlib.redirect_stdout(io.StringIO()):
+            codes = [service.shorten_url(f"https://www.example.com/files/{i}.pdf")["short_code"]
+                     for i in range(args.links)]
+            results = {mode: asyncio.run(measure(service, codes, mode, args.seconds))
+                       for mode in ("idle", "sync", "async")}
+
+        print(f"Redirect latency over {args.seconds:g}s per run (ms)")
+        for mode, latencies in results.items():
+            latencies = sorted(latencies)
+            p99 = latencies[int(len(latencies) * 0.99)]
+            print(f"{mode + ' writes':>12}: p50 {statistics.median(latencies) * 1e3:6.3f}"
+                  f"  p99 {p99 * 1e3:6.3f}  max {latencies[-1] * 1e3:7.3f}")
+        service.flush_clicks()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for in-memory URL records.
+
+Builds N records as plain dicts (the shape json.load produces) and as
+URLRecord objects, each in a fresh subprocess, and reports the traced
+memory per layout.
+
+Usage: python scripts/bench_memory.py [--count 1000000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DOMAINS = ["www.example.com", "abc.supabase.co", "github.com", "docs.python.org"]
+FILE_TYPES = ["document", "image", "link", "video", "webpage"]
+
+
+def make_dict(i):
+    """One record as json.load would return it (no shared strings)"""
+    data = {
+        "long_url": f"https://{DOMAINS[i % 4]}/files/{i}/report.pdf",
+        "short_code": f"c{i:07d}",
+        "created_at": f"2024-01-{i % 28 + 1:02d}T12:{i % 60:02d}:00.{i % 999999:06d}",
+        "description": f"report {i}",
+        "clicks": i % 100,
+        "is_supabase": i % 4 == 1,
+        "file_type": FILE_TYPES[i % 5],
+        "domain": DOMAINS[i % 4],
+        "expiry_date": None,
+        "password_hash": None,
+        "last_accessed": None
+    }
+    # Round-trip so strings are distinct objects, like a loaded snapshot
+    return json.loads(json.dumps(data))
+
+
+def build(layout, count):
+    from app.models.url_record import URLRecord
+
+    tracemalloc.start()
+    store = {}
+    started = time.perf_counter()
+    for i in range(count):
+        data = make_dict(i)
+        if layout == "records":
+            data = URLRecord.from_dict(data)
+        store[f"c{i:07d}"] = data
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    return {"layout": layout, "bytes": current, "seconds": round(elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--layout", choices=["dicts", "records"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        print(json.dumps(build(args.layout, args.count)))
+        return
+
+    print(f"Building {args.count:,} records per layout...")
+    results = []
+    for layout in ("dicts", "records"):
+        output = subprocess.check_output(
+            [sys.executable, __file__, "--count", str(args.count), "--layout", layout]
+        )
+        results.append(json.loads(output))
+
+    baseline = results[0]["bytes"]
+    for result in results:
+        print(
+            f"{result['layout']:>8}: {result['bytes'] / 2**20:8.1f} MiB "
+            f"({result['bytes'] / args.count:.0f} B/record, "
+            f"{result['bytes'] / baseline:.0%} of dicts, built in {result['seconds']}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
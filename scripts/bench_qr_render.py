@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+QR render throughput, inline versus the QR render pool.
+
+Renders distinct URLs (no caching) three ways for each setting:
+  single  one render at a time, as the /api/qr endpoint does
+  bulk    a batch through render_many, as bulk shorten with QR codes does
+  loop    p99 latency of a 1 ms ticker on the event loop while QR codes are
+          rendered on the same loop (render_async with workers > 0)
+
+Usage: python scripts/bench_qr_render.py [--count 200] [--workers 0 2 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.qr_pool import QRRenderPool
+from app.services.qr_render import render_qr
+
+
+def urls(prefix, count):
+    return [f"https://sho.rt/{prefix}{i}" for i in range(count)]
+
+
+async def ticker(stop):
+    """Tick every millisecond; lag is how late each tick ran"""
+    lags = []
+    due = time.perf_counter()
+    while not stop.is_set():
+        due += 0.001
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        lags.append(time.perf_counter() - due)
+        due = max(due, time.perf_counter() - 0.001)
+    return lags
+
+
+async def loop_lag(pool, batch):
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(stop))
+    for url in batch:
+        if pool.workers > 0:
+            await pool.render_async(url)
+        else:
+            render_qr(url)
+            await asyncio.sleep(0)
+    stop.set()
+    lags = sorted(await tick_task)
+    return lags[int(len(lags) * 0.99)] if lags else 0.0
+
+
+def measure(workers, count):
+    pool = QRRenderPool(workers, timeout=30)
+    # Start the processes before timing
+    pool.render("https://sho.rt/warmup")
+
+    started = time.perf_counter()
+    for url in urls(f"s{workers}-", count):
+        pool.render(url)
+    single = count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in pool.render_many((url, "png", 10, 4) for url in urls(f"b{workers}-", count)):
+        pass
+    bulk = count / (time.perf_counter() - started)
+
+    lag = asyncio.run(loop_lag(pool, urls(f"l{workers}-", count)))
+    pool.shutdown()
+    return single, bulk, lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{args.count} distinct PNG QR codes per run, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'single/s':>10} {'bulk/s':>10} {'loop p99 ms':>12}")
+    for workers in args.workers:
+        single, bulk, lag = measure(workers, args.count)
+        label = "inline" if workers == 0 else str(workers)
+        print(f"{label:>8} {single:10.0f} {bulk:10.0f} {lag * 1e3:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
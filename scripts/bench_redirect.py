@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Redirect latency benchmark.
+
+Compares the old two-step redirect lookup (get_url_info, then expand_url)
+with the single-lookup URLService.lookup_redirect, on a temporary JSON store.
+
+Usage: python scripts/bench_redirect.py [--links 10000] [--requests 200000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def two_step(service, code):
+    """What redirect_url did before lookup_redirect existed"""
+    info = service.get_url_info(code)
+    if "error" in info:
+        return None
+    return service.expand_url(code, None)["long_url"]
+
+
+def single_lookup(service, code):
+    redirect, _ = service.lookup_redirect(code)
+    return redirect.long_url if redirect else None
+
+
+def run(service, codes, redirect):
+    started = time.perf_counter()
+    for code in codes:
+        redirect(service, code)
+    return (time.perf_counter() - started) / len(codes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["STORAGE_FILE"] = os.path.join(tmp, "urls.json")
+        from app.services.url_service import URLService
+
+        service = URLService()
+        # shorten_url prints debug output for every link
+        with contextlib.redirect_stdout(io.StringIO()):
+            links = [service.shorten_url(f"https://www.example.com/files/{i}.pdf")["short_code"]
+                     for i in range(args.links)]
+        codes = [random.choice(links) for _ in range(args.requests)]
+
+        print(f"{args.requests:,} redirects over {args.links:,} links")
+        for name, redirect in (("get_url_info + expand_url", two_step), ("lookup_redirect", single_lookup)):
+            run(service, codes[:1000], redirect)
+            print(f"{name:>26}: {run(service, codes, redirect):6.2f} us/redirect")
+        service.flush_clicks()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Cold-start report: import time and time to first redirect.
+
+Starts fresh interpreters against a temporary store holding one link. Each
+run imports the app module and sends it a GET for that link straight
+through ASGI (no server, no startup events), timing both steps. One more
+run under ``-X importtime`` gives the breakdown: self time summed per
+top-level package, and the slowest individual modules.
+
+Usage: python scripts/startup_report.py [--app vercel_app] [--runs 5] [--top 15]
+                                        [--root PATH]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = """
+import contextlib, io
+from app.services.url_service import URLService
+with contextlib.redirect_stdout(io.StringIO()):
+    code = URLService().shorten_url("https://www.example.com/files/report.pdf")["short_code"]
+print(code)
+"""
+
+FIRST_REDIRECT = """
+import time
+started = time.perf_counter()
+import asyncio, contextlib, io, json
+with contextlib.redirect_stdout(io.StringIO()):
+    import {app} as module
+imported = time.perf_counter()
+
+async def get(path):
+    scope = {{"type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "root_path": "", "query_string": b"", "headers": [],
+             "server": ("localhost", 8000), "client": ("127.0.0.1", 1)}}
+    status = []
+    async def receive():
+        return {{"type": "http.request", "body": b"", "more_body": False}}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+    await module.app(scope, receive, send)
+    return status[0]
+
+with contextlib.redirect_stdout(io.StringIO()):
+    status = asyncio.run(get("/{code}"))
+done = time.perf_counter()
+print(json.dumps({{"import": imported - started, "first_redirect": done - started, "status": status}}))
+"""
+
+
+def run(root, env, *args):
+    return subprocess.run([sys.executable, *args], cwd=root, env=env, check=True,
+                          capture_output=True, text=True)
+
+
+def parse_importtime(stderr):
+    """(module, self µs, cumulative µs, depth) for each ``-X importtime`` line"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--app", default="vercel_app", help="module exposing the ASGI app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--root", default=ROOT, help="project tree to profile")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "STORAGE_FILE": os.path.join(tmp, "urls.json"),
+               "SQLITE_FILE": os.path.join(tmp, "urls.db"), "QR_CACHE_DIR": os.path.join(tmp, "qr")}
+        code = run(args.root, env, "-c", SETUP).stdout.strip()
+        script = FIRST_REDIRECT.format(app=args.app, code=code)
+
+        timings = [json.loads(run(args.root, env, "-c", script).stdout) for _ in range(args.runs)]
+        modules = parse_importtime(run(args.root, env, "-X", "importtime", "-c", script).stderr)
+
+    print(f"{args.app}: median of {args.runs} cold starts (GET /{code} -> {timings[0]['status']})")
+    print(f"  import app      {statistics.median(t['import'] for t in timings) * 1e3:8.1f} ms")
+    print(f"  first redirect  {statistics.median(t['first_redirect'] for t in timings) * 1e3:8.1f} ms")
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    total = sum(packages.values())
+    print(f"\nImport self time by top-level package (total {total / 1e3:.1f} ms)")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<28} {self_us / 1e3:8.1f} ms {self_us / total:6.1%}")
+
+    print(f"\nSlowest modules (self / cumulative)")
+    for name, self_us, cumulative_us, depth in sorted(modules, key=lambda m: -m[1])[:args.top]:
+        print(f"  {name:<40} {self_us / 1e3:8.1f} {cumulative_us / 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,20 @@
 """
 URL Shortener with Customization
 A simple Python script to shorten long URLs with custom aliases and expiration options.
+
+Run without arguments for the interactive menu, or import a CSV / NDJSON
+link dump into the web app's store without prompts:
+
+    python scripts/url_shortener.py import links.csv [--storage-file urls.json]
 """
 
+import argparse
 import hashlib
 import random
 import string
 import json
 import os
+import sys
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 import re
@@ -173,8 +180,65 @@ class URLShortener:
         
         return {"urls": url_list}
 
+def import_links(path, fmt=None, storage_file=None, batch_size=None, workers=None, errors_file=None):
+    """Stream a CSV or NDJSON dump into the web app's storage engine; returns
+    the process exit code"""
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if storage_file:
+        os.environ["STORAGE_FILE"] = storage_file
+    from app.core.config import settings
+    from app.services.link_import import FORMATS, LinkImporter, detect_format
+    from app.services.url_service import URLService
+    
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        print("❌ Error: cannot tell the format from the file name, pass --format", file=sys.stderr)
+        return 2
+    
+    url_service = URLService()
+    importer = LinkImporter(
+        url_service,
+        batch_size=batch_size or settings.IMPORT_BATCH_SIZE,
+        workers=settings.IMPORT_WORKERS if workers is None else workers
+    )
+    errors_out = open(errors_file, 'w') if errors_file else sys.stderr
+    source = sys.stdin if path == "-" else open(path, newline='', encoding='utf-8-sig')
+    try:
+        for events in importer.run(source, fmt):
+            for event in events:
+                if "error" in event:
+                    errors_out.write(json.dumps(event) + "\n")
+                else:
+                    print(f"📥 {event['rows']:,} rows, {event['imported']:,} imported, "
+                          f"{event['errors']:,} errors, {event['rows_per_sec'] or 0:,} rows/sec",
+                          file=sys.stderr)
+        # Fold the import into a fresh snapshot
+        url_service.save_urls()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if errors_file:
+            errors_out.close()
+    
+    return 1 if event["errors"] else 0
+
 def main():
     """Main function to handle command line interface"""
+    parser = argparse.ArgumentParser(description="URL Shortener with Customization")
+    commands = parser.add_subparsers(dest="command")
+    import_parser = commands.add_parser("import", help="Import a CSV or NDJSON link dump without prompts")
+    import_parser.add_argument("path", help="CSV or NDJSON file, or - for stdin")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    import_parser.add_argument("--storage-file", help="Web app storage file (default: STORAGE_FILE)")
+    import_parser.add_argument("--batch-size", type=int, help="Rows per batch (default: IMPORT_BATCH_SIZE)")
+    import_parser.add_argument("--workers", type=int, help="Validation processes (default: IMPORT_WORKERS)")
+    import_parser.add_argument("--errors", help="Write rejected rows here as NDJSON instead of stderr")
+    args = parser.parse_args()
+    
+    if args.command == "import":
+        sys.exit(import_links(args.path, args.format, args.storage_file,
+                              args.batch_size, args.workers, args.errors))
+    
     print("🔗 URL Shortener with Customization")
     print("=" * 40)
     
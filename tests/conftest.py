@@ -0,0 +1,11 @@
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def qr_settings(tmp_path, monkeypatch):
+    """Keep rendered QR codes out of the working directory, and render them
+    in-process unless a test starts its own render pool"""
+    monkeypatch.setattr(settings, "QR_CACHE_DIR", str(tmp_path / "qr_cache"))
+    monkeypatch.setattr(settings, "QR_RENDER_WORKERS", 0)
@@ -0,0 +1,39 @@
+from app.services.bloom_filter import BloomFilter
+
+
+def test_no_false_negatives_and_bounded_fp_rate():
+    codes = [f"code{i}" for i in range(5000)]
+    bloom = BloomFilter(0.01, codes, capacity=5000)
+
+    assert all(code in bloom for code in codes)
+    false_positives = sum(f"other{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert bloom.stats()["expected_fp_rate"] < 0.02
+
+
+def test_rebuild_drops_deleted_codes():
+    """A quarter of codes deleted triggers a rebuild that forgets them"""
+    codes = [f"code{i}" for i in range(8)]
+    bloom = BloomFilter(0.01, codes)
+    for code in codes[:2]:
+        bloom.discard(code)
+    assert not bloom.needs_rebuild
+    bloom.discard(codes[2])
+    assert bloom.needs_rebuild
+
+    bloom.rebuild(lambda: codes[3:], 5)
+    assert all(code in bloom for code in codes[3:])
+    assert not any(code in bloom for code in codes[:3])
+    assert bloom.stats()["stale"] == 0
+
+
+def test_codes_added_while_listing_survive_rebuild():
+    """A code stored after the rebuild starts but before its list is taken"""
+    bloom = BloomFilter(0.01, ["a"])
+
+    def list_codes():
+        bloom.add("b")
+        return ["a"]
+
+    bloom.rebuild(list_codes, 1)
+    assert "a" in bloom and "b" in bloom
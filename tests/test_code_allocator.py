@@ -0,0 +1,78 @@
+from app.services.code_allocator import CodeSequence, ShortCodeAllocator
+from app.services.url_service import URLService
+
+
+def test_sequence_is_a_bijection():
+    """Every number in the space maps to a distinct fixed-length code"""
+    sequence = CodeSequence(2, key=12345)
+    codes = {sequence.code(n) for n in range(sequence.space)}
+
+    assert len(codes) == sequence.space == 62 ** 2
+    assert all(len(code) == 2 for code in codes)
+    assert [sequence.code(n) for n in range(3)] != sorted(sequence.code(n) for n in range(3))
+
+
+def test_workers_reserve_disjoint_blocks(tmp_path):
+    """Allocators sharing a counter file never hand out the same code"""
+    counter_file = str(tmp_path / "urls.json.seq")
+    first = ShortCodeAllocator(counter_file, 6, block_size=10)
+    second = ShortCodeAllocator(counter_file, 6, block_size=10)
+    never_taken = lambda code: False
+
+    codes = [first.next_code(never_taken) for _ in range(15)]
+    codes += [second.next_code(never_taken) for _ in range(15)]
+
+    assert len(set(codes)) == 30
+    assert first.blocks_reserved == second.blocks_reserved == 2
+
+
+def test_blocks_reuse_one_lock_and_work_without_fcntl(tmp_path, monkeypatch):
+    """Reserving many blocks keeps one lock file open; no fcntl means no lock"""
+    from app.services import storage
+
+    allocator = ShortCodeAllocator(str(tmp_path / "urls.json.seq"), 6, block_size=2)
+    codes = [allocator.next_code(lambda code: False) for _ in range(10)]
+    assert allocator.blocks_reserved == 5
+    file_lock = allocator._file_lock
+
+    monkeypatch.setattr(storage, "fcntl", None)
+    windows = ShortCodeAllocator(str(tmp_path / "urls.json.seq"), 6, block_size=2)
+    codes += [windows.next_code(lambda code: False) for _ in range(4)]
+
+    assert allocator._file_lock is file_lock
+    assert not windows._file_lock.enabled
+    assert len(set(codes)) == len(codes)
+
+
+def test_taken_codes_are_skipped(tmp_path):
+    """Codes already used by a custom alias or legacy link are passed over"""
+    allocator = ShortCodeAllocator(str(tmp_path / "urls.json.seq"), 6)
+    probed = []
+
+    def taken(code):
+        probed.append(code)
+        return len(probed) == 1
+
+    assert allocator.next_code(taken) == probed[1] != probed[0]
+
+
+def test_alias_suffixes_count_up_without_reprobing(tmp_path):
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    service.shorten_url("https://www.example.com/report.pdf", custom_alias="report-2")
+    probes = []
+    taken = lambda code: probes.append(code) or code in service.urls
+
+    codes = [service.shorten_url("https://www.example.com/report.pdf")["short_code"]
+             for _ in range(4)]
+
+    assert codes == ["report", "report-1", "report-3", "report-4"]
+    assert service.codes.next_suffixed("report", taken) == "report-5"
+    assert probes == ["report-5"]
+
+
+def test_short_codes_without_alias_source_are_unique(tmp_path):
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    codes = {service.generate_short_code() for _ in range(1000)}
+
+    assert len(codes) == 1000
+    assert all(len(code) == 6 and code.isalnum() for code in codes)
@@ -0,0 +1,82 @@
+import io
+import json
+
+from app.services.link_import import LinkImporter, decode_lines, detect_format, read_rows
+from app.services.url_service import URLService
+
+
+def run_import(service, text, fmt, batch_size=2):
+    events = [event for batch in LinkImporter(service, batch_size=batch_size).run(io.StringIO(text), fmt)
+              for event in batch]
+    return [e for e in events if "error" in e], [e for e in events if "error" not in e]
+
+
+def test_csv_rows_keep_their_codes_and_counts(tmp_path):
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    text = (
+        "short_code,long_url,created_at,clicks,description\n"
+        "old1,https://www.example.com/a.pdf,1700000000,7,\n"
+        ",https://www.example.com/files/report.pdf,,,Report\n"
+        "bad code,https://www.example.com/b.pdf,,,\n"
+        "old1,https://www.example.com/c.pdf,,,\n"
+        "old2,not a url,,,\n"
+    )
+    log_entries = service.urls.log_entries
+
+    errors, progress = run_import(service, text, "csv")
+
+    assert [e["row"] for e in errors] == [3, 4, 5]
+    assert errors[1]["error"] == "Short code 'old1' is already taken"
+    assert progress[-1] == {**progress[-1], "rows": 5, "imported": 2, "errors": 3, "done": True}
+    assert [p["rows"] for p in progress] == [2, 4, 5, 5]
+    # One write per batch; batches with nothing to store write nothing
+    assert service.urls.log_entries == log_entries + 1
+    assert service.urls["old1"].clicks == 7
+    assert service.urls["old1"].created_at == 1700000000
+    assert service.get_url_info("report")["description"] == "Report"
+
+
+def test_ndjson_reports_unparseable_lines(tmp_path):
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    text = "\n".join([
+        json.dumps({"url": "https://www.example.com/a.pdf"}),
+        "{not json",
+        "",
+        json.dumps(["https://www.example.com/b.pdf"]),
+        json.dumps({"long_url": "https://www.example.com/c.pdf", "expiry_date": "2020-01-01T00:00:00"})
+    ])
+
+    errors, progress = run_import(service, text, "ndjson", batch_size=10)
+
+    assert [(e["row"], e["error"].split(":")[0]) for e in errors] == [
+        (2, "Invalid JSON"), (3, "Expected a JSON object")
+    ]
+    assert progress[-1]["imported"] == 2
+    assert service.get_url_info("c") == {"error": "Short URL has expired"}
+
+
+def test_csv_saved_with_a_byte_order_mark(tmp_path):
+    """Excel's UTF-8 CSVs start with a BOM, which must not end up in the
+    first header name"""
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    raw = io.BytesIO("short_code,long_url\nbom1,https://www.example.com/a.pdf\n".encode("utf-8-sig"))
+
+    events = [e for batch in LinkImporter(service).run(decode_lines(raw), "csv") for e in batch]
+
+    assert not [e for e in events if "error" in e]
+    assert service.urls["bom1"].long_url == "https://www.example.com/a.pdf"
+
+
+def test_format_detection_and_streaming_parse():
+    assert detect_format("dump.CSV") == "csv"
+    assert detect_format("dump.jsonl") == "ndjson"
+    assert detect_format("dump.txt") is None
+
+    def lines():
+        yield "long_url\n"
+        for i in range(3):
+            yield f"https://www.example.com/{i}.pdf\n"
+        raise AssertionError("read past the rows that were asked for")
+
+    rows = read_rows(lines(), "csv")
+    assert [next(rows)[0] for _ in range(3)] == [1, 2, 3]
@@ -10,6 +10,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from app import app
 from app.core.dependencies import get_url_service
+from app.services.storage import JSONStorage
 
 @pytest.fixture
 def client():
@@ -26,14 +27,18 @@ def temp_storage():
     # Override the storage file
     url_service = get_url_service()
     original_storage = url_service.storage_file
+    original_urls = url_service.urls
     url_service.storage_file = temp_file
-    url_service.urls = {}
+    url_service.urls = JSONStorage(temp_file)
     
     yield temp_file
     
     # Cleanup
     url_service.storage_file = original_storage
+    url_service.urls = original_urls
     os.unlink(temp_file)
+    if os.path.exists(f"{temp_file}.log"):
+        os.unlink(f"{temp_file}.log")
 
 def test_read_main(client):
     """Test the main page loads"""
@@ -0,0 +1,42 @@
+import asyncio
+
+from app.core.middleware import FastRedirectMiddleware
+from app.services.url_service import URLService
+
+
+def call(app, path):
+    """Run one GET through an ASGI app; return (status, headers, scope state)"""
+    messages = []
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    return start["status"], dict(start.get("headers", [])), scope.get("state")
+
+
+async def fallback_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_cache_hits_bypass_the_app(tmp_path):
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    app = FastRedirectMiddleware(fallback_app, service, reserved={"api", "dashboard"})
+
+    # First request misses the cache and reaches the app
+    assert call(app, f"/{code}") == (200, {}, {"redirect_cache_checked": True})
+    service.lookup_redirect(code, use_cache=False)
+
+    status, headers, _ = call(app, f"/{code}")
+    assert status == 302
+    assert headers[b"location"] == b"https://www.example.com/a.pdf"
+    assert call(app, "/dashboard") == (200, {}, None)
+    assert call(app, f"/api/{code}") == (200, {}, None)
+    assert service.get_stats()["total_clicks"] == 2
@@ -0,0 +1,57 @@
+from app.services.qr_cache import QRCache
+
+
+def test_size_bound_evicts_least_recently_used():
+    cache = QRCache(max_bytes=10)
+    cache.put("a", "png", b"aaaa", 0.01)
+    cache.put("b", "png", b"bbbb", 0.01)
+    assert cache.get("a", "png") == b"aaaa"
+
+    cache.put("c", "png", b"cccc", 0.01)
+
+    assert cache.get("b", "png") is None
+    assert cache.bytes == 8
+    assert cache.evictions == 1
+    # Larger than the whole cache: never stored
+    cache.put("d", "png", b"d" * 11, 0.01)
+    assert cache.get("d", "png") is None
+
+
+def test_invalidate_drops_every_variant():
+    cache = QRCache(max_bytes=100)
+    cache.put("a", ("png", 10), b"1", 0.02)
+    cache.put("a", ("svg",), b"22", 0.02)
+    cache.put("b", ("png", 10), b"333", 0.02)
+
+    cache.invalidate("a")
+
+    assert len(cache) == 1
+    assert cache.bytes == 3
+    assert cache.get("a", ("svg",)) is None
+
+
+def test_stats_report_time_saved():
+    cache = QRCache(max_bytes=100)
+    cache.get("a", "png")
+    cache.put("a", "png", b"x", 0.004)
+    cache.get("a", "png")
+    cache.get("a", "png")
+
+    stats = cache.stats()
+    assert stats["hit_ratio"] == round(2 / 3, 4)
+    assert stats["avg_render_ms"] == 4.0
+    assert stats["time_saved_ms"] == 8.0
+
+
+def test_images_from_disk_do_not_count_as_renders():
+    cache = QRCache(max_bytes=100)
+    cache.get("a", "png")
+    cache.put("a", "png", b"x", 0.004)
+    cache.get("b", "png")
+    cache.put("b", "png", b"y")
+    cache.get("b", "png")
+
+    stats = cache.stats()
+    assert cache.renders == 1
+    assert stats["avg_render_ms"] == 4.0
+    assert stats["time_saved_ms"] == 4.0
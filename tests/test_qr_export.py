@@ -0,0 +1,21 @@
+import io
+import zipfile
+
+from app.services.qr_export import qr_zip
+from app.services.url_service import URLService
+
+
+def test_zip_streams_one_piece_per_chunk(tmp_path):
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    codes = [r["short_code"] for r in service.bulk_shorten(
+        [f"https://www.example.com/files/{i}.pdf" for i in range(5)])]
+
+    pieces = list(qr_zip(service, codes + ["missing", codes[0]], "svg", chunk_size=2))
+
+    # Six distinct codes in three chunks, then missing.txt and the central directory
+    assert len(pieces) == 4
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(pieces)))
+    assert archive.namelist() == [f"{code}.svg" for code in codes] + ["missing.txt"]
+    assert archive.read("missing.txt") == b"missing\n"
+    assert archive.read(f"{codes[1]}.svg") == service.qr_image(f"{service.base_url}/{codes[1]}", "svg")
+    assert archive.getinfo(f"{codes[1]}.svg").compress_type == zipfile.ZIP_DEFLATED
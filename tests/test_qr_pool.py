@@ -0,0 +1,39 @@
+import asyncio
+
+from app.services.qr_pool import QRRenderPool
+from app.services.qr_render import render_qr
+
+
+def test_workers_render_the_same_images_in_order():
+    pool = QRRenderPool(workers=1, timeout=30)
+    urls = [f"https://sho.rt/{i}" for i in range(5)]
+    try:
+        assert pool.render(urls[0]) == render_qr(urls[0])
+        images = list(pool.render_many((url, "svg", 10, 4) for url in urls))
+        assert asyncio.run(pool.render_async(urls[1], "svg")) == images[1]
+    finally:
+        pool.shutdown()
+
+    assert images == [render_qr(url, "svg") for url in urls]
+    assert pool.stats()["rendered"] == 7
+    assert pool.inline == 0
+
+
+def test_timeouts_fall_back_to_rendering_inline():
+    pool = QRRenderPool(workers=1, timeout=0)
+    try:
+        assert pool.render("https://sho.rt/a") == render_qr("https://sho.rt/a")
+    finally:
+        pool.shutdown()
+
+    assert pool.timeouts == 1
+    assert pool.inline == 1
+
+
+def test_no_workers_renders_in_process():
+    pool = QRRenderPool(workers=0, timeout=30)
+
+    assert asyncio.run(pool.render_async("https://sho.rt/a")) == render_qr("https://sho.rt/a")
+    assert list(pool.render_many([("https://sho.rt/b", "png", 10, 4)])) == [render_qr("https://sho.rt/b")]
+    assert pool.inline == 2
+    assert pool._pool is None
@@ -0,0 +1,29 @@
+from app.services.redirect_cache import RedirectCache
+
+
+def test_one_off_codes_do_not_evict_hot_ones():
+    """TinyLFU admission keeps frequently used codes over a scan"""
+    cache = RedirectCache(capacity=10)
+    hot = [f"hot{i}" for i in range(10)]
+    for _ in range(5):
+        for code in hot:
+            if cache.get(code, now=0) is None:
+                cache.put(code, f"https://example.com/{code}", expires_at=100)
+
+    # One-off codes mixed into ongoing hot traffic
+    for i in range(1000):
+        for code in (f"scan{i}", hot[i % 10]):
+            if cache.get(code, now=0) is None:
+                cache.put(code, f"https://example.com/{code}", expires_at=100)
+
+    assert all(cache.get(code, now=0) is not None for code in hot)
+    assert cache.stats()["size"] == 10
+
+
+def test_entries_expire():
+    cache = RedirectCache(capacity=10)
+    cache.put("abc", "https://example.com/", expires_at=100)
+
+    assert cache.get("abc", now=100) is not None
+    assert cache.get("abc", now=101) is None
+    assert len(cache) == 0
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.services.redirect_queue import RedirectQueue
+from app.services.url_service import URLService
+
+
+async def start(queue, handler):
+    task = asyncio.create_task(queue.run(handler))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_drop_policy_counts_dropped_events():
+    """A full queue drops events instead of waiting"""
+    applied = []
+
+    async def scenario():
+        queue = RedirectQueue(2, "drop")
+        task = await start(queue, applied.extend)
+        results = [queue.offer("a", 1) for _ in range(3)]
+        assert queue.depth == 2
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return queue, results
+
+    queue, results = asyncio.run(scenario())
+    assert results == [True, True, False]
+    assert queue.stats()["dropped"] == 1
+    assert [event[0] for event in applied] == ["a", "a"]
+    assert not queue.running
+
+
+def test_block_policy_waits_for_space():
+    """Under the block policy a full queue makes the producer wait"""
+    async def scenario():
+        queue = RedirectQueue(1, "block")
+        batches = []
+        task = await start(queue, batches.append)
+        await queue.put("a", 1)
+        # The second put can only finish once the consumer took the first
+        await asyncio.wait_for(queue.put("b", 2), timeout=1)
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return queue, batches
+
+    queue, batches = asyncio.run(scenario())
+    assert [event[0] for batch in batches for event in batch] == ["a", "b"]
+    assert queue.dropped == 0
+    assert queue.processed == 2
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        RedirectQueue(10, "spill")
+
+
+def test_redirects_queue_clicks_while_consumer_runs(tmp_path):
+    """Clicks wait in the queue, count in stats and per link, and are applied
+    in a batch"""
+    service = URLService(storage_file=str(tmp_path / "urls.json"))
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+
+    async def scenario():
+        task = await start(service.redirect_events, service.apply_redirect_events)
+        for _ in range(3):
+            assert service.lookup_redirect(code)[1] is None
+        queued = (service.redirect_events.depth, service.clicks.pending_clicks,
+                  service.get_stats()["total_clicks"], service.get_url_info(code)["clicks"])
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return queued
+
+    assert asyncio.run(scenario()) == (3, 0, 3, 3)
+    assert service.clicks.pending_clicks == 3
+    assert service.get_url_info(code)["clicks"] == 3
+    assert service.redirect_events.pending(code) is None
+    assert service.metrics()["redirect_queue"]["batches"] == 1
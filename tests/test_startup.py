@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFERRED = ("numpy", "qrcode", "PIL", "validators", "multiprocessing")
+
+
+def test_redirects_do_not_import_heavy_dependencies(tmp_path):
+    script = f"""
+import sys
+from app.services.url_service import URLService
+service = URLService(storage_file={str(tmp_path / "urls.json")!r})
+service.lookup_redirect("missing")
+print(",".join(name for name in {DEFERRED!r} if name in sys.modules))
+"""
+    env = {**os.environ, "QR_CACHE_DIR": str(tmp_path / "qr")}
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+
+def test_worker_processes_do_not_open_the_store(tmp_path):
+    """Spawned QR workers re-import the main module; importing the app must
+    not create the URL service, which would load (and may repair) the store"""
+    script = tmp_path / "serve.py"
+    script.write_text(f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import main
+from app.services.qr_pool import QRRenderPool
+
+if __name__ == "__main__":
+    pool = QRRenderPool(1, timeout=30)
+    pool.render("https://sho.rt/abc")
+    assert pool.rendered == 1
+    pool.shutdown()
+""")
+    env = {**os.environ, "STORAGE_FILE": str(tmp_path / "urls.json"),
+           "QR_CACHE_DIR": str(tmp_path / "qr")}
+    subprocess.run([sys.executable, str(script)], cwd=str(tmp_path), env=env,
+                   capture_output=True, text=True, check=True)
+
+    assert not any(name.startswith("urls.json") for name in os.listdir(tmp_path))
@@ -0,0 +1,334 @@
+import json
+import os
+
+import pytest
+
+from app.models.url_record import URLRecord, to_epoch
+from app.services.stats_aggregates import RECENT_WINDOW
+from app.services.storage import JSONStorage, StorageBackend
+
+
+@pytest.fixture
+def storage_file(tmp_path):
+    """Path to a fresh storage file"""
+    return str(tmp_path / "urls.json")
+
+
+def make_record(short_code, long_url="https://www.example.com/file.pdf"):
+    return URLRecord.from_dict({
+        "long_url": long_url,
+        "short_code": short_code,
+        "created_at": "2024-01-01T12:00:00",
+        "description": "Link",
+        "clicks": 0,
+        "is_supabase": False,
+        "file_type": "document",
+        "domain": "www.example.com",
+        "expiry_date": None,
+        "password_hash": None,
+        "last_accessed": None
+    })
+
+
+def test_mutations_are_appended_not_rewritten(storage_file):
+    """Each mutation adds one log line and leaves the snapshot alone"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+    storage.patch("abc", clicks=1)
+    del storage["abc"]
+
+    assert not os.path.exists(storage_file)
+    with open(storage.log_file, encoding="utf-8") as f:
+        # Header line plus one entry per mutation
+        assert len(f.readlines()) == 4
+    assert storage.log_entries == 3
+
+
+def test_log_is_replayed_on_load(storage_file):
+    """A new instance sees every logged mutation"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+    storage["def"] = make_record("def")
+    storage.patch("abc", clicks=5, last_accessed="2024-01-02T00:00:00")
+    del storage["def"]
+
+    reloaded = JSONStorage(storage_file)
+    assert list(reloaded) == ["abc"]
+    assert reloaded["abc"].clicks == 5
+    assert reloaded["abc"].last_accessed == to_epoch("2024-01-02T00:00:00")
+
+
+def test_legacy_urls_json_is_imported(storage_file):
+    """A plain urls.json from older versions still loads"""
+    with open(storage_file, "w", encoding="utf-8") as f:
+        json.dump({"old": make_record("old").to_dict()}, f, indent=2)
+
+    storage = JSONStorage(storage_file)
+    storage["new"] = make_record("new")
+
+    reloaded = JSONStorage(storage_file)
+    assert set(reloaded) == {"old", "new"}
+
+
+def test_torn_log_line_is_skipped(storage_file):
+    """An interrupted final write does not prevent startup"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+    with open(storage.log_file, "a", encoding="utf-8") as f:
+        f.write('{"op":"put","code":"xyz","rec')
+
+    reloaded = JSONStorage(storage_file)
+    assert list(reloaded) == ["abc"]
+
+    # The torn line is dropped so later entries are not glued onto it
+    reloaded["def"] = make_record("def")
+    assert set(JSONStorage(storage_file)) == {"abc", "def"}
+
+
+def test_save_writes_snapshot_and_resets_log(storage_file):
+    """Saving folds the log into the snapshot"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+    storage.save()
+
+    assert storage.log_entries == 0
+    with open(storage.log_file, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+    assert list(JSONStorage(storage_file)) == ["abc"]
+
+
+def test_compaction_keeps_entries_written_during_snapshot(storage_file, monkeypatch):
+    """Mutations that race with a snapshot survive in the new log"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+
+    original_chunks = JSONStorage._snapshot_chunks
+
+    def chunks_with_concurrent_write(records, meta, chunk_size=1000):
+        storage["def"] = make_record("def")
+        storage.patch("abc", clicks=7)
+        return original_chunks(records, meta, chunk_size)
+
+    monkeypatch.setattr(storage, "_snapshot_chunks", chunks_with_concurrent_write)
+    storage.compact()
+
+    with open(storage_file, encoding="utf-8") as f:
+        assert set(json.load(f)["urls"]) == {"abc"}
+    assert storage.log_entries == 2
+
+    reloaded = JSONStorage(storage_file)
+    assert set(reloaded) == {"abc", "def"}
+    assert reloaded["abc"].clicks == 7
+
+
+def test_snapshot_without_log_truncation_is_not_replayed_twice(storage_file):
+    """A crash between swapping the snapshot and the log is recoverable"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+    storage.patch("abc", clicks=1)
+    log_before = open(storage.log_file, "rb").read()
+
+    storage.compact()
+    # Simulate the crash by restoring the old log next to the new snapshot
+    with open(storage.log_file, "wb") as f:
+        f.write(log_before)
+
+    reloaded = JSONStorage(storage_file)
+    assert reloaded.log_entries == 0
+    assert reloaded["abc"].clicks == 1
+
+
+def test_sqlite_imports_json_store(storage_file, tmp_path):
+    """An empty SQLite database picks up the existing JSON store"""
+    from app.services.sqlite_storage import SQLiteStorage
+
+    legacy = JSONStorage(storage_file)
+    legacy["abc"] = make_record("abc")
+    legacy.patch("abc", clicks=3)
+
+    storage = SQLiteStorage(str(tmp_path / "urls.db"), legacy_file=storage_file)
+    assert list(storage) == ["abc"]
+    assert storage["abc"].clicks == 3
+    assert storage["abc"].created_at == to_epoch("2024-01-01T12:00:00")
+    storage.close()
+
+
+def test_shared_stores_see_each_others_writes(storage_file):
+    """Processes sharing a JSON store pick up each other's log entries"""
+    first = JSONStorage(storage_file, shared=True)
+    second = JSONStorage(storage_file, shared=True)
+
+    first["abc"] = make_record("abc")
+    assert "abc" not in second
+    assert second.refresh() == ["abc"]
+    assert second["abc"].long_url == "https://www.example.com/file.pdf"
+
+    del second["abc"]
+    second["def"] = make_record("def")
+    assert sorted(first.refresh()) == ["abc", "def"]
+    assert set(first) == {"def"}
+
+    # Own entries are not applied twice when tailing the log
+    assert second.refresh() == []
+
+
+def test_shared_click_increments_add_up(storage_file):
+    """Click batches from several processes are summed, not overwritten"""
+    first = JSONStorage(storage_file, shared=True)
+    first["abc"] = make_record("abc")
+    second = JSONStorage(storage_file, shared=True)
+
+    first.add_clicks({"abc": (2, "2024-01-02T00:00:00")})
+    second.add_clicks({"abc": (3, "2024-01-03T00:00:00")})
+    first.refresh()
+    second.refresh()
+
+    assert first["abc"].clicks == second["abc"].clicks == 5
+    assert JSONStorage(storage_file)["abc"].clicks == 5
+
+
+def test_shared_store_follows_compaction_by_another_process(storage_file):
+    """A reader continues in the new log without reloading the snapshot"""
+    first = JSONStorage(storage_file, shared=True)
+    second = JSONStorage(storage_file, shared=True)
+    first["abc"] = make_record("abc")
+    second.refresh()
+
+    second["def"] = make_record("def")
+    first.compact()
+    first["ghi"] = make_record("ghi")
+
+    assert sorted(second.refresh()) == ["ghi"]
+    assert set(second) == {"abc", "def", "ghi"}
+    assert set(JSONStorage(storage_file)) == {"abc", "def", "ghi"}
+
+
+def test_shared_store_reloads_when_it_fell_behind(storage_file):
+    """A reader that missed entries folded into a snapshot reloads it"""
+    first = JSONStorage(storage_file, shared=True)
+    second = JSONStorage(storage_file, shared=True)
+    first["abc"] = make_record("abc")
+    first.compact()
+
+    assert second.refresh() is None
+    assert set(second) == {"abc"}
+
+
+def test_reload_keeps_own_writes_missing_from_the_snapshot(storage_file):
+    """A full reload replays this writer's own log entries too"""
+    first = JSONStorage(storage_file, shared=True)
+    second = JSONStorage(storage_file, shared=True)
+    first["y"] = make_record("y")
+    first.compact()
+
+    second["x"] = make_record("x")
+    second.refresh()
+    assert set(second) == {"x", "y"}
+
+    second.compact()
+    assert set(JSONStorage(storage_file)) == {"x", "y"}
+
+
+def test_reload_leaves_a_line_being_written_alone(storage_file):
+    """A reload forced by another process's compaction never truncates the
+    log, whose last line may still be being written"""
+    first = JSONStorage(storage_file, shared=True)
+    second = JSONStorage(storage_file, shared=True)
+    first["abc"] = make_record("abc")
+    first.compact()
+
+    line = json.dumps({"op": "put", "code": "def", "record": make_record("def").to_dict()})
+    with open(f"{storage_file}.log", "a") as f:
+        f.write(line[:20])
+    assert second.refresh() is None
+    with open(f"{storage_file}.log", "a") as f:
+        f.write(line[20:] + "\n")
+
+    assert second.refresh() == ["def"]
+    assert set(JSONStorage(storage_file)) == {"abc", "def"}
+
+
+def test_sqlite_change_feed(tmp_path):
+    """Workers sharing a SQLite file learn which links others changed"""
+    from app.services.sqlite_storage import SQLiteStorage
+
+    first = SQLiteStorage(str(tmp_path / "urls.db"))
+    second = SQLiteStorage(str(tmp_path / "urls.db"))
+
+    first["abc"] = make_record("abc")
+    first.add_clicks({"abc": (1, "2024-01-02T00:00:00")})
+    assert second.refresh() == ["abc"]
+    assert second["abc"].clicks == 1
+
+    del first["abc"]
+    assert second.refresh() == ["abc"]
+    assert second.refresh() == []
+    first.close()
+    second.close()
+
+
+def test_columnar_summary_matches_scan(storage_file):
+    """The NumPy columns and running aggregates agree with a record scan"""
+    pytest.importorskip("numpy")
+    storage = JSONStorage(storage_file)
+    for i in range(2000):
+        storage[f"c{i}"] = make_record(f"c{i}")
+    for i in range(0, 2000, 3):
+        del storage[f"c{i}"]
+    storage.add_clicks({"c1": (4, 1704100000), "c2": (2, 1704100000)})
+    storage.patch("c4", expiry_date="2024-01-05T00:00:00")
+    now, window = to_epoch("2024-01-03T00:00:00"), 3 * 24 * 3600
+
+    expected = StorageBackend.recount(storage, now, window)
+    assert storage.recount(now, window) == expected
+    assert expected["total_clicks"] == 6
+    assert JSONStorage(storage_file).recount(now, window) == expected
+    assert storage.summarize(now) == StorageBackend.recount(storage, now)
+
+
+def test_aggregates_age_out(storage_file):
+    """Links leave the recent and active counts as time passes"""
+    storage = JSONStorage(storage_file)
+    storage["abc"] = make_record("abc")
+    storage["def"] = make_record("def")
+    storage.patch("def", expiry_date="2024-01-03T00:00:00")
+    created = to_epoch("2024-01-01T12:00:00")
+
+    stats = storage.summarize(created + 60)
+    assert (stats["recent_urls"], stats["active_urls"]) == (2, 2)
+    stats = storage.summarize(to_epoch("2024-01-03T00:00:01"))
+    assert (stats["recent_urls"], stats["active_urls"]) == (2, 1)
+    stats = storage.summarize(created + RECENT_WINDOW)
+    assert (stats["recent_urls"], stats["active_urls"]) == (0, 1)
+
+    del storage["def"]
+    storage["ghi"] = make_record("ghi")
+    assert storage.summarize(created + RECENT_WINDOW + 1) == {
+        "total_urls": 2, "total_clicks": 0, "recent_urls": 0, "active_urls": 2
+    }
+
+
+def test_purge_expired_is_logged_once(storage_file):
+    """A purge batch is one log entry and survives a reload"""
+    storage = JSONStorage(storage_file)
+    for code in ("abc", "def", "ghi"):
+        storage[code] = make_record(code)
+    storage.patch("abc", expiry_date="2024-01-02T00:00:00")
+    storage.patch("def", expiry_date="2024-01-03T00:00:00")
+    storage.patch("abc", expiry_date="2024-02-01T00:00:00")
+    entries = storage.log_entries
+
+    assert storage.purge_expired(to_epoch("2024-01-10T00:00:00"), limit=10) == ["def"]
+    assert storage.log_entries == entries + 1
+    assert sorted(JSONStorage(storage_file)) == ["abc", "ghi"]
+
+
+def test_put_many_is_one_log_entry(storage_file):
+    """A batch of records is logged once and replayed by other processes"""
+    storage = JSONStorage(storage_file, shared=True)
+    other = JSONStorage(storage_file, shared=True)
+    storage.put_many({code: make_record(code) for code in ("a", "b", "c")})
+
+    assert storage.log_entries == 1
+    assert sorted(other.refresh()) == ["a", "b", "c"]
+    assert [record.short_code for record in JSONStorage(storage_file).newest()] == ["c", "b", "a"]
@@ -0,0 +1,35 @@
+from app.models.url_record import NEVER, URLRecord
+
+
+def test_dict_round_trip():
+    """from_dict/to_dict keep the API and on-disk shape"""
+    data = {
+        "long_url": "https://www.example.com/file.pdf",
+        "short_code": "abc",
+        "created_at": "2024-01-01T12:00:00",
+        "description": "Link",
+        "clicks": 3,
+        "is_supabase": False,
+        "file_type": "document",
+        "domain": "www.example.com",
+        "expiry_date": "2024-02-01T00:00:00",
+        "password_hash": None,
+        "last_accessed": "2024-01-02T08:30:00"
+    }
+    record = URLRecord.from_dict(data)
+
+    assert record.to_dict() == data
+    assert URLRecord.from_dict(record.to_dict()) == record
+
+
+def test_compact_fields():
+    """Domains are interned, file types indexed and no expiry is NEVER"""
+    first = URLRecord.from_dict({"long_url": "https://a.io/x", "short_code": "a",
+                                 "domain": "".join(["a", ".io"]), "file_type": "image"})
+    second = URLRecord.from_dict({"long_url": "https://a.io/y", "short_code": "b",
+                                  "domain": "".join(["a", ".io"]), "file_type": "image"})
+
+    assert first.domain is second.domain
+    assert first.file_type == "image" and first.file_type_id == second.file_type_id
+    assert first.expires_at == NEVER and first.expiry_date is None
+    assert not hasattr(first, "__dict__")
@@ -0,0 +1,466 @@
+import pytest
+
+from app.core.config import settings
+from app.services.url_service import URLService
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def service(request, tmp_path, monkeypatch):
+    """URL service backed by a temporary store of each backend type"""
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(settings, "SQLITE_FILE", str(tmp_path / "urls.db"))
+    url_service = URLService(storage_file=str(tmp_path / "urls.json"))
+    yield url_service
+    url_service.urls.close()
+
+
+def test_records_round_trip(service):
+    """Stored records come back in the service's dict shape"""
+    result = service.shorten_url(
+        "https://abc.supabase.co/storage/v1/object/public/files/photo.png",
+        description="Photo"
+    )
+    record = service.urls[result["short_code"]]
+
+    assert record.long_url == result["long_url"]
+    assert record.to_dict()["created_at"] == result["created_at"]
+    assert record.is_supabase is True
+    assert record.file_type == "image"
+    assert record.expiry_date is None
+    assert service.get_url_info("missing") == {"error": "Short URL not found"}
+
+
+def test_clicks_are_buffered_until_flush(service):
+    """Redirects do not write to storage until a batch is due"""
+    code = service.shorten_url("https://www.example.com/report.pdf")["short_code"]
+    log_entries = service.urls.log_entries
+
+    service.expand_url(code)
+    service.expand_url(code)
+
+    assert service.urls.log_entries == log_entries
+    assert service.urls[code].clicks == 0
+
+
+def test_pending_clicks_are_reported_exactly(service):
+    """Info, listing and stats merge in clicks that are still buffered"""
+    code = service.shorten_url("https://www.example.com/report.pdf")["short_code"]
+    service.expand_url(code)
+    service.expand_url(code)
+
+    info = service.get_url_info(code)
+    assert info["clicks"] == 2
+    assert info["last_accessed"] is not None
+    assert service.list_urls()["urls"][0]["clicks"] == 2
+    assert service.get_stats()["total_clicks"] == 2
+
+
+def test_flush_persists_clicks_in_one_entry(service):
+    """A flush writes a single log entry for all buffered clicks"""
+    first = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    second = service.shorten_url("https://www.example.com/b.pdf")["short_code"]
+    service.expand_url(first)
+    service.expand_url(second)
+    service.expand_url(second)
+    log_entries = service.urls.log_entries
+
+    service.flush_clicks()
+
+    assert service.urls.log_entries == log_entries + 1
+    reloaded = URLService(storage_file=service.storage_file)
+    assert reloaded.get_url_info(first)["clicks"] == 1
+    assert reloaded.get_url_info(second)["clicks"] == 2
+
+
+def test_flush_happens_at_size_threshold(service, monkeypatch):
+    """Reaching the batch size queues a flush on the storage I/O thread"""
+    monkeypatch.setattr(service.clicks, "max_pending", 3)
+    code = service.shorten_url("https://www.example.com/report.pdf")["short_code"]
+
+    for _ in range(3):
+        service.expand_url(code)
+    service.wait_for_io()
+
+    assert service.clicks.pending_clicks == 0
+    assert service.urls[code].clicks == 3
+
+
+def test_async_writes_run_on_io_thread(service, monkeypatch):
+    """Async mutations run in order on the I/O thread, not the event loop"""
+    import asyncio
+    import threading
+
+    threads = []
+    store = service.urls.__class__.insert_many
+    def record_thread(self, records):
+        threads.append(threading.current_thread().name)
+        return store(self, records)
+    monkeypatch.setattr(service.urls.__class__, "insert_many", record_thread)
+
+    async def shorten_and_delete():
+        results = await asyncio.gather(*(
+            service.shorten_url_async(f"https://www.example.com/{i}.pdf") for i in range(5)
+        ))
+        deleted = await service.delete_url_async(results[0]["short_code"])
+        return results, deleted
+
+    results, deleted = asyncio.run(shorten_and_delete())
+
+    assert [r["short_code"] for r in results] == ["0", "1", "2", "3", "4"]
+    assert deleted["success"]
+    assert results[0]["short_code"] not in service.urls
+    assert threads and all(name.startswith("url-store-io") for name in threads)
+
+
+def test_delete_drops_pending_clicks(service):
+    """Clicks buffered for a deleted link are not counted or persisted"""
+    code = service.shorten_url("https://www.example.com/report.pdf")["short_code"]
+    service.expand_url(code)
+    service.delete_url(code)
+
+    assert service.get_stats()["total_clicks"] == 0
+    service.flush_clicks()
+    assert code not in service.urls
+
+
+def test_stats_windows(service):
+    """Recent and active counts follow creation and expiry times"""
+    from datetime import datetime, timedelta
+
+    service.shorten_url("https://www.example.com/a.pdf")
+    service.shorten_url("https://www.example.com/b.pdf",
+                        expiry_date=datetime.now() - timedelta(days=1))
+    old = service.shorten_url("https://www.example.com/c.pdf")["short_code"]
+    service.urls.patch(old, created_at=(datetime.now() - timedelta(days=30)).isoformat())
+
+    stats = service.get_stats()
+    assert stats["total_urls"] == 3
+    assert stats["recent_urls"] == 2
+    assert stats["active_urls"] == 2
+
+
+def test_stats_debug_recount(service, monkeypatch):
+    """Debug mode checks the running stats against a full recount"""
+    monkeypatch.setattr(settings, "STATS_DEBUG", True)
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    service.expand_url(code)
+    service.flush_clicks()
+
+    assert service.get_stats() == {
+        "total_urls": 1, "total_clicks": 1, "recent_urls": 1, "active_urls": 1
+    }
+
+
+def test_cursor_pagination_matches_offsets(service):
+    """Walking next_cursor visits the same newest-first pages as offsets"""
+    codes = [service.shorten_url(f"https://www.example.com/{i}.pdf")["short_code"]
+             for i in range(7)]
+    # Give some links the same creation second to exercise the tie-break
+    for i, code in enumerate(codes):
+        service.urls.patch(code, created_at=f"2024-01-0{1 + i // 2}T12:00:00")
+
+    by_offset = [service.list_urls(limit=3, offset=offset)["urls"] for offset in (0, 3, 6)]
+    pages, cursor = [], None
+    while True:
+        result = service.list_urls(limit=3, cursor=cursor)
+        pages.append(result["urls"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == by_offset
+    assert [url["short_code"] for url in service.list_urls()["urls"]] == \
+        [url["short_code"] for page in pages for url in page]
+    assert pages[0][0]["short_code"] == codes[6]
+    assert service.list_urls(limit=3, cursor="bogus") == {"error": "Invalid cursor"}
+
+
+def test_expired_links_are_purged_in_batches(service, monkeypatch):
+    """Links past the retention period are deleted a batch at a time"""
+    from datetime import datetime, timedelta
+
+    monkeypatch.setattr(settings, "EXPIRY_SWEEP_BATCH", 1)
+    long_ago = datetime.now() - timedelta(days=3)
+    old = [service.shorten_url(f"https://www.example.com/{i}.pdf", expiry_date=long_ago)["short_code"]
+           for i in range(2)]
+    recent = service.shorten_url("https://www.example.com/r.pdf",
+                                 expiry_date=datetime.now() - timedelta(minutes=1))["short_code"]
+    kept = service.shorten_url("https://www.example.com/k.pdf")["short_code"]
+
+    assert [service.purge_expired() for _ in range(3)] == [1, 1, 0]
+    assert all(code not in service.urls for code in old)
+    assert service.get_url_info(recent) == {"error": "Short URL has expired"}
+    assert service.get_url_info(kept)["success"]
+
+
+def test_lookup_redirect(service):
+    """lookup_redirect checks expiry and password and counts the click"""
+    def resolve(code, password=None):
+        redirect, error = service.lookup_redirect(code, password)
+        return (redirect.long_url if redirect else None), error
+
+    from datetime import datetime, timedelta
+
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    locked = service.shorten_url("https://www.example.com/b.pdf", password="secret")["short_code"]
+    expired = service.shorten_url("https://www.example.com/c.pdf",
+                                  expiry_date=datetime.now() - timedelta(days=1))["short_code"]
+
+    assert resolve(code) == ("https://www.example.com/a.pdf", None)
+    assert resolve("missing") == (None, "Short URL not found")
+    assert resolve(expired) == (None, "Short URL has expired")
+    assert resolve(locked) == (None, "Password required")
+    assert resolve(locked, "wrong") == (None, "Invalid password")
+    assert resolve(locked, "secret") == ("https://www.example.com/b.pdf", None)
+    assert service.get_stats()["total_clicks"] == 2
+
+
+def test_redirect_cache(service):
+    """Hot links are served from the cache until deleted"""
+    code = service.shorten_url("https://www.example.com/a.pdf?v=[1]")["short_code"]
+    locked = service.shorten_url("https://www.example.com/b.pdf", password="secret")["short_code"]
+
+    for _ in range(3):
+        redirect, error = service.lookup_redirect(code)
+        service.lookup_redirect(locked, "secret")
+    assert dict(redirect.raw_headers)[b"location"] == b"https://www.example.com/a.pdf?v=[1]"
+    assert service.metrics()["redirect_cache"]["size"] == 1
+    assert service.redirect_cache.hits == 2
+    assert service.get_stats()["total_clicks"] == 6
+
+    service.delete_url(code)
+    assert service.lookup_redirect(code) == (None, "Short URL not found")
+
+
+def test_links_deleted_during_a_lookup_are_not_cached(service, monkeypatch):
+    """A lookup that read a link just before it was deleted does not put it
+    back into the redirect cache"""
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    put = service.redirect_cache.put
+    def delete_first(*args):
+        service.delete_url(code)
+        return put(*args)
+    monkeypatch.setattr(service.redirect_cache, "put", delete_first)
+
+    assert service.lookup_redirect(code)[1] is None
+    assert service.cached_redirect(code) is None
+    assert service.lookup_redirect(code) == (None, "Short URL not found")
+
+
+def test_unknown_codes_skip_storage(service):
+    """The Bloom filter answers for unknown codes and tracks deletions"""
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    assert service.lookup_redirect("nope") == (None, "Short URL not found")
+    assert service.known_codes.negatives == 1
+
+    service.delete_url(code)
+    assert service.lookup_redirect(code) == (None, "Short URL not found")
+    assert service.metrics()["bloom_filter"]["false_positives"] == 1
+
+    service.rebuild_filter()
+    assert code not in service.known_codes
+
+
+def test_dedup_reuses_links_across_restarts(service, monkeypatch):
+    """Re-shortening a URL returns its link until that link is deleted"""
+    monkeypatch.setattr(settings, "DEDUP_URLS", True)
+    service = URLService(storage_file=service.storage_file)
+    first = service.shorten_url("https://WWW.example.com:443/files/report.pdf")
+    log_entries = service.urls.log_entries
+
+    again = service.shorten_url(" https://www.example.com/files/report.pdf")
+    assert again["short_code"] == first["short_code"]
+    assert service.urls.log_entries == log_entries
+    locked = service.shorten_url("https://www.example.com/files/report.pdf", password="secret")
+    assert locked["short_code"] != first["short_code"]
+
+    service.urls.save()
+    restarted = URLService(storage_file=service.storage_file)
+    assert restarted.shorten_url("https://www.example.com/files/report.pdf")["short_code"] == first["short_code"]
+
+    restarted.delete_url(first["short_code"])
+    links = len(restarted.urls)
+    fresh = restarted.shorten_url("https://www.example.com/files/report.pdf")["short_code"]
+    assert len(restarted.urls) == links + 1
+    # A delete another worker made is caught when the entry is used
+    del restarted.urls[fresh]
+    restarted.shorten_url("https://www.example.com/files/report.pdf")
+    assert len(restarted.urls) == links + 1
+
+
+def test_bulk_shorten_commits_once(service):
+    """A batch gets distinct codes, keeps input order and is written once"""
+    service.shorten_url("https://www.example.com/report.pdf")
+    log_entries = service.urls.log_entries
+
+    results = service.bulk_shorten([
+        "https://www.example.com/report.pdf",
+        "not a url",
+        "https://www.example.com/files/report.pdf",
+        "https://www.example.com/photo.png"
+    ])
+
+    assert [r.get("short_code") for r in results] == ["report-1", None, "report-2", "photo"]
+    assert results[1] == {"error": "Please provide a valid URL"}
+    assert all(r.get("qr_code") is None for r in results)
+    assert service.urls.log_entries == log_entries + 1
+    assert service.lookup_redirect("report-2")[0].long_url == "https://www.example.com/files/report.pdf"
+
+
+def test_bulk_shorten_streams_chunks(service, monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(settings, "BULK_COMMIT_SIZE", 2)
+
+    async def collect():
+        return [chunk async for chunk in service.bulk_shorten_async(
+            [f"https://www.example.com/{i}.pdf" for i in range(5)])]
+
+    chunks = asyncio.run(collect())
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert service.urls.log_entries == 3
+
+
+def test_qr_codes_are_cached_until_delete(service):
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    short_url = f"{service.base_url}/{code}"
+
+    first = service.generate_qr_code(short_url)
+    assert first.startswith("data:image/png;base64,")
+    assert service.generate_qr_code(short_url) == first
+    assert service.metrics()["qr_cache"]["hits"] == 2
+
+    service.delete_url(code)
+    assert len(service.qr_cache) == 0
+
+
+def test_qr_images_are_content_addressed_on_disk(service):
+    from app.services.qr_render import qr_key
+
+    code = service.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    short_url = f"{service.base_url}/{code}"
+    svg = service.qr_image(short_url, "svg")
+    assert svg.startswith(b"<?xml")
+    assert service.qr_disk.get(qr_key(short_url, "svg"), "svg") == svg
+
+    # Another worker (empty memory cache) reads the file instead of rendering
+    other = URLService(storage_file=service.storage_file)
+    assert other.qr_image(short_url, "svg") == svg
+    assert other.qr_disk.hits == 1
+
+    service.delete_url(code)
+    assert service.qr_disk.get(qr_key(short_url, "svg"), "svg") is None
+    assert service.qr_code_for(code, inline=False) == f"{service.base_url}/api/qr/{code}"
+
+
+def test_async_qr_images_use_the_disk_cache_off_the_event_loop(service, monkeypatch):
+    """Disk cache files are read and written on a thread, never on the loop"""
+    import asyncio
+    import threading
+
+    threads = []
+    get, put = service.qr_disk.get, service.qr_disk.put
+    monkeypatch.setattr(service.qr_disk, "get",
+                        lambda *args: threads.append(threading.current_thread()) or get(*args))
+    monkeypatch.setattr(service.qr_disk, "put",
+                        lambda *args: threads.append(threading.current_thread()) or put(*args))
+    url = f"{service.base_url}/abc"
+
+    rendered = asyncio.run(service.qr_image_async(url))
+    service.qr_cache.invalidate(url)
+    assert asyncio.run(service.qr_image_async(url)) == rendered
+
+    assert service.qr_disk.hits == 1 and service.qr_disk.writes == 1
+    assert len(threads) == 3 and threading.current_thread() not in threads
+
+
+def test_bulk_qr_codes_match_single_renders(service):
+    results = service.bulk_shorten(["https://www.example.com/a.pdf", "nope",
+                                    "https://www.example.com/b.pdf"], with_qr=True)
+
+    assert results[1] == {"error": "Please provide a valid URL"}
+    for result in (results[0], results[2]):
+        assert result["qr_code"] == service.generate_qr_code(result["short_url"])
+    assert service.qr_renderer.inline == 2
+
+
+def test_sqlite_workers_see_each_others_links(tmp_path, monkeypatch):
+    """SQLite is shared without SHARED_STORE: a miss syncs from the database"""
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "SQLITE_FILE", str(tmp_path / "urls.db"))
+    first = URLService(storage_file=str(tmp_path / "urls.json"))
+    second = URLService(storage_file=str(tmp_path / "urls.json"))
+    code = first.shorten_url("https://www.example.com/a.pdf")["short_code"]
+
+    redirect, error = second.lookup_redirect(code)
+    assert error is None and redirect.long_url == "https://www.example.com/a.pdf"
+    first.urls.close()
+    second.urls.close()
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_workers_never_overwrite_each_others_codes(tmp_path, monkeypatch, backend):
+    """A code another worker stored since the last sync is not replaced"""
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(settings, "SQLITE_FILE", str(tmp_path / "urls.db"))
+    monkeypatch.setattr(settings, "SHARED_STORE", True)
+    first = URLService(storage_file=str(tmp_path / "urls.json"))
+    second = URLService(storage_file=str(tmp_path / "urls.json"))
+    first.shorten_url("https://www.example.com/a.pdf", custom_alias="report")
+    first.shorten_url("https://www.example.com/files/deck.pdf")
+
+    assert second.shorten_url("https://www.example.com/b.pdf", custom_alias="report") == {
+        "error": "Custom alias 'report' is already taken"}
+    assert second.shorten_url("https://www.example.org/deck.pdf")["short_code"] == "deck-1"
+    results = second.bulk_shorten(["https://www.example.net/deck.pdf"])
+    assert results[0]["short_code"] == "deck-2"
+
+    first.sync()
+    assert first.lookup_redirect("report")[0].long_url == "https://www.example.com/a.pdf"
+    assert first.lookup_redirect("deck")[0].long_url == "https://www.example.com/files/deck.pdf"
+    assert first.lookup_redirect("deck-2")[0].long_url == "https://www.example.net/deck.pdf"
+    first.urls.close()
+    second.urls.close()
+
+
+def test_unknown_codes_sync_at_most_once_per_interval(tmp_path, monkeypatch):
+    """A burst of unknown codes reads the shared log once, not per request"""
+    monkeypatch.setattr(settings, "SHARED_STORE", True)
+    monkeypatch.setattr(settings, "SHARED_MISS_SYNC_INTERVAL", 60)
+    first = URLService(storage_file=str(tmp_path / "urls.json"))
+    second = URLService(storage_file=str(tmp_path / "urls.json"))
+    refreshes = []
+    refresh = second.urls.refresh
+    monkeypatch.setattr(second.urls, "refresh", lambda: refreshes.append(1) or refresh())
+
+    code = first.shorten_url("https://www.example.com/a.pdf")["short_code"]
+    assert second.lookup_redirect(code)[1] is None
+    for i in range(20):
+        assert second.lookup_redirect(f"scan{i}") == (None, "Short URL not found")
+    assert len(refreshes) == 1
+
+
+def test_async_shorten_renders_qr_codes_off_the_io_thread(service, monkeypatch):
+    """Queued writes never wait behind QR rendering"""
+    import asyncio
+    import threading
+
+    threads = []
+    render = service.qr_renderer.render_many
+    def record_thread(jobs):
+        threads.append(threading.current_thread().name)
+        return render(jobs)
+    monkeypatch.setattr(service.qr_renderer, "render", lambda *a: threads.append("io") or b"")
+    monkeypatch.setattr(service.qr_renderer, "render_many", record_thread)
+
+    async def shorten():
+        single = await service.shorten_url_async("https://www.example.com/a.pdf")
+        bulk = [r async for chunk in service.bulk_shorten_async(
+            ["https://www.example.com/b.pdf"], with_qr=True) for r in chunk]
+        return single, bulk
+
+    single, bulk = asyncio.run(shorten())
+
+    assert single["qr_code"] == service.generate_qr_code(single["short_url"])
+    assert bulk[0]["qr_code"] == service.generate_qr_code(bulk[0]["short_url"])
+    assert threads and not any(name.startswith(("io", "url-store-io")) for name in threads)
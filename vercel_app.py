@@ -1,7 +1,7 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import Depends, FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from pathlib import Path
 import sys
 
@@ -15,6 +15,9 @@ from app.routers.url_router import router as url_router
 from app.routers.api_router import router as api_router
 from app.core.config import settings
 from app.core.dependencies import get_url_service
+from app.core.tasks import start_background_tasks, stop_background_tasks
+from app.core.middleware import FastRedirectMiddleware
+from app.services.url_service import URLService
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,24 +37,25 @@ app.mount("/static", StaticFiles(directory=BASE_DIR / "app" / "static"), name="s
 # Initialize templates
 templates = Jinja2Templates(directory=BASE_DIR / "app" / "templates")
 
-# Get shared URL service
-url_service = get_url_service()
+# The URL service is created by get_url_service on first use, not here:
+# QR render and import worker processes re-import this module when they start
 
 # Include routers
 app.include_router(url_router)
 app.include_router(api_router, prefix="/api")
 
 @app.get("/health")
-async def health_check():
+async def health_check(url_service: URLService = Depends(get_url_service)):
     """Health check endpoint for monitoring"""
     return {
         "status": "healthy",
         "service": "Universal URL Shortener",
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "storage": url_service.storage_stats()
     }
 
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
+async def home(request: Request, url_service: URLService = Depends(get_url_service)):
     """Home page with URL shortening interface"""
     recent_urls = url_service.get_recent_urls(limit=10)
     stats = url_service.get_stats()
@@ -65,38 +69,55 @@ async def home(request: Request):
     )
 
 @app.get("/{short_code}")
-async def redirect_url(request: Request, short_code: str, password: str = None):
+async def redirect_url(
+    request: Request,
+    short_code: str,
+    password: str = None,
+    url_service: URLService = Depends(get_url_service)
+):
     """Redirect to original URL or show password form if needed"""
+    # FastRedirectMiddleware already missed the cache for this request
+    use_cache = not getattr(request.state, "redirect_cache_checked", False)
+    redirect, error = url_service.lookup_redirect(short_code, password, use_cache, count_click=False)
     
-    # First check if URL exists and if it needs password
-    url_info = url_service.get_url_info(short_code)
-    if "error" in url_info:
-        raise HTTPException(status_code=404, detail="URL not found")
-    
-    # If URL requires password but none provided, show password form
-    if url_info.get("has_password") and not password:
+    if error == "Password required":
         return templates.TemplateResponse(
             "password_form.html",
             {"request": request, "short_code": short_code}
         )
+    if error == "Invalid password":
+        return templates.TemplateResponse(
+            "password_form.html",
+            {"request": request, "short_code": short_code, "error": "Invalid password"}
+        )
+    if error:
+        # Same body as HTTPException(404) without the exception handling
+        return JSONResponse({"detail": "URL not found"}, status_code=404)
     
-    # Try to expand URL with password (if provided)
-    result = url_service.expand_url(short_code, password)
-    
-    if "error" in result:
-        if result["error"] == "Invalid password":
-            return templates.TemplateResponse(
-                "password_form.html",
-                {"request": request, "short_code": short_code, "error": "Invalid password"}
-            )
-        else:
-            raise HTTPException(status_code=404, detail="URL not found")
-    
-    return RedirectResponse(url=result["long_url"], status_code=302)
+    await url_service.record_click_async(short_code)
+    return redirect.response()
+
+# Serve cached redirects before routing; installed after every route is
+# defined so their first path segments can be reserved
+if settings.FAST_REDIRECTS:
+    app.add_middleware(
+        FastRedirectMiddleware,
+        url_service=get_url_service,
+        reserved={route.path.strip("/").split("/")[0] for route in app.routes}
+    )
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize application on startup"""
+    """Open the URL store and start background tasks"""
+    start_background_tasks(get_url_service())
     print("🚀 Universal URL Shortener started on Vercel!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and persist buffered clicks on shutdown"""
+    url_service = get_url_service()
+    await stop_background_tasks()
+    await url_service.flush_clicks_async()
+    url_service.qr_renderer.shutdown()
+
 # For Vercel deployment, just expose the app. No handler, no Mangum.